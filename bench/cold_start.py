@@ -0,0 +1,80 @@
+"""
+Cold-start time of `test/app.py` built pre-initialized and plain.
+
+Builds the application both ways with `test_sdk.build`, then starts each
+component `--runs` times with wasmtime, alternating between the two, and
+reports the wall-clock time from process start to exit. Needs
+`componentize-py` and `wasmtime` on the path (or `--componentize-py` and
+`--wasmtime`):
+
+    python bench/cold_start.py [--json] [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+from typing import Dict, List
+
+from test_sdk import build
+
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "test")
+VARIANTS = {"preinit": True, "plain": False}
+
+
+def start(wasmtime: str, component: str) -> int:
+    begin = time.perf_counter_ns()
+    subprocess.run([wasmtime, "run", "-S", "http", component], check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter_ns() - begin
+
+
+def summarize(name: str, samples: List[int]) -> Dict[str, object]:
+    ordered = sorted(samples)
+    return {
+        "variant": name,
+        "runs": len(ordered),
+        "min_ms": round(ordered[0] / 1e6, 3),
+        "median_ms": round(statistics.median(ordered) / 1e6, 3),
+        "p90_ms": round(ordered[min(len(ordered) - 1, len(ordered) * 9 // 10)] / 1e6, 3),
+        "max_ms": round(ordered[-1] / 1e6, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cold start of pre-initialized and plain builds.")
+    parser.add_argument("--runs", type=int, default=20, help="starts per variant")
+    parser.add_argument("--app", default=APP_DIR, help="application directory")
+    parser.add_argument("--componentize-py", default="componentize-py")
+    parser.add_argument("--wasmtime", default="wasmtime")
+    parser.add_argument("--json", action="store_true", help="print JSON lines instead of a table")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        components = {
+            name: build.build(args.app, os.path.join(workdir, f"{name}.wasm"), preinit, args.componentize_py)
+            for name, preinit in VARIANTS.items()
+        }
+        # One unmeasured start each, so both see a warm compilation cache.
+        for component in components.values():
+            start(args.wasmtime, component)
+        samples: Dict[str, List[int]] = {name: [] for name in VARIANTS}
+        for _ in range(args.runs):
+            for name, component in components.items():
+                samples[name].append(start(args.wasmtime, component))
+    rows = [summarize(name, samples[name]) for name in VARIANTS]
+    if args.json:
+        for row in rows:
+            print(json.dumps(row, sort_keys=True))
+        return
+    print(f"{'variant':<10} {'min ms':>10} {'median ms':>10} {'p90 ms':>10} {'max ms':>10}")
+    for row in rows:
+        print(f"{row['variant']:<10} {row['min_ms']:>10} {row['median_ms']:>10} {row['p90_ms']:>10} {row['max_ms']:>10}")
+    base, fast = rows[1]["median_ms"], rows[0]["median_ms"]
+    if fast:
+        print(f"plain / pre-initialized median: {base / fast:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
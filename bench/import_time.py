@@ -0,0 +1,100 @@
+"""
+Import-time budget for `test_sdk`.
+
+Imports `test_sdk` in `--runs` fresh interpreters with `-X importtime` and
+fails (exit status 1) when the median cumulative import time exceeds
+`--budget-ms`, or when the import loads a generated interface outside
+`EAGER` or a module in `DEFERRED`. Interfaces are loaded on first use (see
+`test_sdk.wit.imports`), so a new module-level import of one shows up here
+before it shows up as a slower cold start:
+
+    python bench/import_time.py [--budget-ms 75] [--runs 15] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import List
+
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+EAGER = frozenset((
+    "error",
+    "exit",
+    "monotonic_clock",
+    "poll",
+    "stderr",
+    "stdout",
+    "streams",
+    "terminal_output",
+    "terminal_stderr",
+    "terminal_stdout",
+))
+"""The interfaces `RunHandler.run` always needs, loaded by `import test_sdk`."""
+
+DEFERRED = ("traceback",)
+"""Other modules `import test_sdk` must not load."""
+
+_LIST_MODULES = "import sys, test_sdk; print('\\n'.join(sys.modules))"
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (SRC, env.get("PYTHONPATH"))))
+    return env
+
+
+def import_us() -> int:
+    """
+    The cumulative time of one cold `import test_sdk`, in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import test_sdk"],
+        env=_env(), capture_output=True, text=True, check=True,
+    )
+    for line in reversed(result.stderr.splitlines()):
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == "test_sdk":
+            return int(fields[1])
+    raise RuntimeError("no import time reported for test_sdk")
+
+
+def unexpected_modules() -> List[str]:
+    result = subprocess.run([sys.executable, "-c", _LIST_MODULES], env=_env(), capture_output=True, text=True, check=True)
+    loaded = result.stdout.split()
+    prefix = "test_sdk.wit.imports."
+    unexpected = [name for name in loaded if name.startswith(prefix) and name[len(prefix):] not in EAGER]
+    unexpected.extend(name for name in DEFERRED if name in loaded)
+    return sorted(unexpected)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fail when cold import of test_sdk regresses.")
+    parser.add_argument("--budget-ms", type=float, default=75.0, help="maximum median import time")
+    parser.add_argument("--runs", type=int, default=15, help="fresh interpreters to measure")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+    samples = sorted(import_us() for _ in range(args.runs))
+    median_ms = statistics.median(samples) / 1000
+    unexpected = unexpected_modules()
+    ok = median_ms <= args.budget_ms and not unexpected
+    if args.json:
+        print(json.dumps({
+            "median_ms": round(median_ms, 3),
+            "min_ms": round(samples[0] / 1000, 3),
+            "budget_ms": args.budget_ms,
+            "unexpected_modules": unexpected,
+            "ok": ok,
+        }, sort_keys=True))
+    else:
+        print(f"import test_sdk: median {median_ms:.1f} ms, min {samples[0] / 1000:.1f} ms (budget {args.budget_ms:.1f} ms)")
+        for name in unexpected:
+            print(f"unexpectedly loaded: {name}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
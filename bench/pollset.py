@@ -0,0 +1,79 @@
+"""
+Per-wait Python overhead of `PollSet` versus rebuilding the pollable list.
+
+`poll.poll` is replaced by an in-process stand-in that reports one ready
+pollable without blocking, so the numbers show only the Python-side cost of
+preparing a wait and dispatching its result.
+
+    python bench/pollset.py [--json] [--waits N]
+"""
+import argparse
+import json
+import time
+
+from test_sdk.pollset import PollSet
+from test_sdk.wit.imports import poll
+
+
+class StandInPollable(poll.Pollable):
+    def ready(self) -> bool:
+        return True
+
+    def block(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+def stand_in_poll(in_):
+    return [len(in_) - 1]
+
+
+def rebuild(registrations: int, waits: int) -> float:
+    owners = [(StandInPollable(), lambda: None) for _ in range(registrations)]
+    start = time.perf_counter_ns()
+    for _ in range(waits):
+        pollables = [pollable for pollable, _ in owners]
+        by_index = dict(enumerate(owners))
+        for index in poll.poll(pollables):
+            by_index[index][1]()
+    return (time.perf_counter_ns() - start) / waits
+
+
+def pollset(registrations: int, waits: int) -> float:
+    pollables = PollSet()
+    for _ in range(registrations):
+        pollables.register(StandInPollable(), lambda: None)
+    start = time.perf_counter_ns()
+    for _ in range(waits):
+        pollables.wait()
+    return (time.perf_counter_ns() - start) / waits
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--json", action="store_true", help="print one JSON object per line")
+    parser.add_argument("--waits", type=int, default=2000)
+    args = parser.parse_args()
+    poll.poll = stand_in_poll
+    if not args.json:
+        print(f"{'registered':>10} {'rebuild ns/wait':>16} {'PollSet ns/wait':>16} {'speedup':>8}")
+    for registrations in (10, 1_000, 10_000):
+        waits = max(10, args.waits * 10 // max(10, registrations // 10))
+        baseline = rebuild(registrations, waits)
+        persistent = pollset(registrations, waits)
+        if args.json:
+            print(json.dumps({
+                "benchmark": "pollset.wait",
+                "registered": registrations,
+                "waits": waits,
+                "rebuild_ns_per_wait": round(baseline),
+                "pollset_ns_per_wait": round(persistent),
+            }))
+        else:
+            print(f"{registrations:>10} {baseline:>16.0f} {persistent:>16.0f} {baseline / persistent:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
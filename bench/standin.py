@@ -0,0 +1,269 @@
+"""
+In-process CPython stand-ins for the WASI host, for benchmarks.
+
+`InputStream`, `OutputStream` and `Pollable` are implemented on top of file
+descriptors (regular files and pipes), `monotonic_clock` on
+`time.monotonic_ns`, and `poll.poll` on `select`. Every
+stand-in method counts as one host call in `calls`, so benchmarks can report
+host calls per MiB next to throughput.
+"""
+import os
+import select
+import time
+from collections import Counter
+from typing import List, Optional
+
+from test_sdk.wit.imports import poll
+from test_sdk.wit.imports import monotonic_clock
+from test_sdk.wit.imports import streams
+from test_sdk.wit.types import Err
+
+
+calls: "Counter[str]" = Counter()
+"""Host calls made through the stand-ins, by method name."""
+
+
+class StandInPollable(poll.Pollable):
+    """
+    A pollable that is always ready.
+    """
+
+    def ready(self) -> bool:
+        return True
+
+    def block(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+class FdPollable(poll.Pollable):
+    """
+    Ready when `fd` is readable (or writable, with `write=True`).
+    """
+
+    def __init__(self, fd: int, write: bool = False) -> None:
+        self.fd = fd
+        self.write = write
+
+    def ready(self) -> bool:
+        calls["pollable.ready"] += 1
+        return _select([self], 0) != []
+
+    def block(self) -> None:
+        calls["pollable.block"] += 1
+        _select([self], None)
+
+    def __exit__(self, *exc_info) -> None:
+        calls["pollable.drop"] += 1
+
+
+class ClockPollable(poll.Pollable):
+    """
+    Ready once `time.monotonic_ns()` reaches `deadline`.
+    """
+
+    def __init__(self, deadline: int) -> None:
+        self.deadline = deadline
+
+    def ready(self) -> bool:
+        calls["pollable.ready"] += 1
+        return time.monotonic_ns() >= self.deadline
+
+    def block(self) -> None:
+        calls["pollable.block"] += 1
+        _select([self], None)
+
+    def __exit__(self, *exc_info) -> None:
+        calls["pollable.drop"] += 1
+
+
+def _select(pollables: List[poll.Pollable], timeout: Optional[float]) -> List[int]:
+    # Indices of the ready pollables, waiting up to `timeout` seconds for
+    # one (forever when `None`).
+    end = None if timeout is None else time.monotonic() + timeout
+    readers = [p.fd for p in pollables if isinstance(p, FdPollable) and not p.write]
+    writers = [p.fd for p in pollables if isinstance(p, FdPollable) and p.write]
+    deadlines = [p.deadline for p in pollables if isinstance(p, ClockPollable)]
+    while True:
+        now = time.monotonic_ns()
+        ready = [
+            index for index, p in enumerate(pollables)
+            if not isinstance(p, (FdPollable, ClockPollable)) or (isinstance(p, ClockPollable) and p.deadline <= now)
+        ]
+        waits = [(deadline - now) / 1e9 for deadline in deadlines]
+        if end is not None:
+            waits.append(end - time.monotonic())
+        wait = 0 if ready else max(0, min(waits)) if waits else None
+        readable, writable, _ = select.select(readers, writers, [], wait)
+        fds = set(readable) | set(writable)
+        ready.extend(index for index, p in enumerate(pollables) if isinstance(p, FdPollable) and p.fd in fds)
+        if ready or (end is not None and time.monotonic() >= end):
+            return sorted(ready)
+
+
+def stand_in_poll(in_: List[poll.Pollable]) -> List[int]:
+    calls["poll"] += 1
+    return _select(in_, None)
+
+
+class FdInputStream(streams.InputStream):
+    """
+    An input stream reading from `fd` without blocking.
+    """
+
+    def __init__(self, fd: int) -> None:
+        os.set_blocking(fd, False)
+        self.fd = fd
+        self.eof = False
+
+    def read(self, len: int) -> bytes:
+        calls["read"] += 1
+        return self._read(len)
+
+    def _read(self, len: int) -> bytes:
+        if self.eof:
+            raise Err(streams.StreamError_Closed())
+        try:
+            data = os.read(self.fd, len)
+        except BlockingIOError:
+            return b""
+        if not data and len:
+            self.eof = True
+            raise Err(streams.StreamError_Closed())
+        return data
+
+    def blocking_read(self, len: int) -> bytes:
+        calls["blocking_read"] += 1
+        while True:
+            data = self._read(len)
+            if data or not len:
+                return data
+            select.select([self.fd], [], [])
+
+    def skip(self, len: int) -> int:
+        calls["skip"] += 1
+        return _length(self._read(len))
+
+    def blocking_skip(self, len: int) -> int:
+        calls["blocking_skip"] += 1
+        while True:
+            count = _length(self._read(len))
+            if count or not len:
+                return count
+            select.select([self.fd], [], [])
+
+    def subscribe(self) -> poll.Pollable:
+        calls["subscribe"] += 1
+        return FdPollable(self.fd)
+
+    def __exit__(self, *exc_info) -> None:
+        calls["drop"] += 1
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class FdOutputStream(streams.OutputStream):
+    """
+    An output stream writing to `fd`, granting `permit` bytes per
+    `check_write`.
+    """
+
+    def __init__(self, fd: int, permit: int = 1024 * 1024) -> None:
+        self.fd = fd
+        self.permit = permit
+
+    def check_write(self) -> int:
+        calls["check_write"] += 1
+        return self.permit
+
+    def write(self, contents: bytes) -> None:
+        calls["write"] += 1
+        self._write(contents)
+
+    def _write(self, contents) -> None:
+        if len(contents) > self.permit:
+            raise RuntimeError("trap: write exceeds check-write permit")
+        view = memoryview(contents)
+        while view:
+            view = view[os.write(self.fd, view):]
+
+    def blocking_write_and_flush(self, contents: bytes) -> None:
+        calls["blocking_write_and_flush"] += 1
+        if len(contents) > 4096:
+            raise RuntimeError("trap: blocking-write-and-flush of more than 4096 bytes")
+        self._write(contents)
+
+    def flush(self) -> None:
+        calls["flush"] += 1
+
+    def blocking_flush(self) -> None:
+        calls["blocking_flush"] += 1
+
+    def subscribe(self) -> poll.Pollable:
+        calls["subscribe"] += 1
+        return FdPollable(self.fd, write=True)
+
+    def write_zeroes(self, len: int) -> None:
+        calls["write_zeroes"] += 1
+        self._write(bytes(len))
+
+    def blocking_write_zeroes_and_flush(self, len: int) -> None:
+        calls["blocking_write_zeroes_and_flush"] += 1
+        if len > 4096:
+            raise RuntimeError("trap: blocking-write-zeroes-and-flush of more than 4096 bytes")
+        self._write(bytes(len))
+
+    def splice(self, src: streams.InputStream, len: int) -> int:
+        calls["splice"] += 1
+        return self._splice(src, min(len, self.permit))
+
+    def blocking_splice(self, src: streams.InputStream, len: int) -> int:
+        calls["blocking_splice"] += 1
+        while True:
+            count = self._splice(src, min(len, self.permit))
+            if count or not len:
+                return count
+            select.select([src.fd], [], [])
+
+    def _splice(self, src: "FdInputStream", len: int) -> int:
+        # Host-side copy: the bytes never become Python objects when the
+        # kernel can splice; otherwise they are copied here, below the
+        # component boundary.
+        if hasattr(os, "splice"):
+            try:
+                count = os.splice(src.fd, self.fd, len)
+            except BlockingIOError:
+                return 0
+            except OSError:
+                pass
+            else:
+                if not count and len:
+                    src.eof = True
+                    raise Err(streams.StreamError_Closed())
+                return count
+        data = src._read(len)
+        self._write(data)
+        return _length(data)
+
+    def __exit__(self, *exc_info) -> None:
+        calls["drop"] += 1
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def _length(data: bytes) -> int:
+    return len(data)
+
+
+def install() -> None:
+    """
+    Route `poll.poll` and `monotonic_clock` through the stand-ins.
+    """
+    poll.poll = stand_in_poll
+    monotonic_clock.now = time.monotonic_ns
+    monotonic_clock.subscribe_instant = ClockPollable
+    monotonic_clock.subscribe_duration = lambda when: ClockPollable(time.monotonic_ns() + when)
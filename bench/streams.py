@@ -0,0 +1,297 @@
+"""
+Throughput of every transfer API in `streams.py`, swept across chunk sizes.
+
+Runs against the in-process stand-ins in `standin.py`, over regular files or
+pipes, and reports bytes per second and host calls per MiB for each API and
+chunk size. JSON-lines output (the default) is stable so runs can be diffed:
+
+    python bench/streams.py --size 64 --transport pipe > before.jsonl
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterator, Tuple
+
+from test_sdk.wit.imports import streams
+from test_sdk.wit.types import Err
+from test_sdk.reader import BufferedReader
+from test_sdk.splice import copy_stream
+from test_sdk.writer import BufferedWriter
+
+import standin
+
+
+CHUNKS = [256, 1024, 4096, 16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024]
+
+
+def _closed(error: Err) -> bool:
+    return isinstance(error.value, streams.StreamError_Closed)
+
+
+def bench_read(src, dst, chunk: int, size: int) -> int:
+    total = 0
+    pollable = src.subscribe()
+    try:
+        while True:
+            data = src.read(chunk)
+            if not data:
+                pollable.block()
+            total += len(data)
+    except Err as error:
+        if not _closed(error):
+            raise
+    finally:
+        pollable.__exit__(None, None, None)
+    return total
+
+
+def bench_blocking_read(src, dst, chunk: int, size: int) -> int:
+    total = 0
+    try:
+        while True:
+            total += len(src.blocking_read(chunk))
+    except Err as error:
+        if not _closed(error):
+            raise
+    return total
+
+
+def bench_skip(src, dst, chunk: int, size: int) -> int:
+    total = 0
+    pollable = src.subscribe()
+    try:
+        while True:
+            count = src.skip(chunk)
+            if not count:
+                pollable.block()
+            total += count
+    except Err as error:
+        if not _closed(error):
+            raise
+    finally:
+        pollable.__exit__(None, None, None)
+    return total
+
+
+def bench_blocking_skip(src, dst, chunk: int, size: int) -> int:
+    total = 0
+    try:
+        while True:
+            total += src.blocking_skip(chunk)
+    except Err as error:
+        if not _closed(error):
+            raise
+    return total
+
+
+def bench_check_write(src, dst, chunk: int, size: int) -> int:
+    data = bytes(chunk)
+    pollable = dst.subscribe()
+    total = 0
+    while total < size:
+        permit = dst.check_write()
+        if not permit:
+            pollable.block()
+            continue
+        count = min(permit, chunk, size - total)
+        dst.write(data[:count])
+        total += count
+    dst.flush()
+    pollable.block()
+    pollable.__exit__(None, None, None)
+    return total
+
+
+def bench_blocking_write_and_flush(src, dst, chunk: int, size: int) -> int:
+    # The API is limited to 4096 bytes per call.
+    step = min(chunk, 4096)
+    data = bytes(step)
+    total = 0
+    while total < size:
+        count = min(step, size - total)
+        dst.blocking_write_and_flush(data[:count])
+        total += count
+    return total
+
+
+def bench_splice(src, dst, chunk: int, size: int) -> int:
+    total = 0
+    readable = src.subscribe()
+    try:
+        while True:
+            count = dst.splice(src, chunk)
+            if not count:
+                readable.block()
+            total += count
+    except Err as error:
+        if not _closed(error):
+            raise
+    finally:
+        readable.__exit__(None, None, None)
+    return total
+
+
+def bench_blocking_splice(src, dst, chunk: int, size: int) -> int:
+    total = 0
+    try:
+        while True:
+            total += dst.blocking_splice(src, chunk)
+    except Err as error:
+        if not _closed(error):
+            raise
+    return total
+
+
+def bench_buffered_reader(src, dst, chunk: int, size: int) -> int:
+    reader = BufferedReader(src, buffer_size=max(chunk, 64 * 1024))
+    target = bytearray(chunk)
+    total = 0
+    while True:
+        count = reader.readinto(target)
+        if not count:
+            reader.close()
+            return total
+        total += count
+
+
+def bench_buffered_writer(src, dst, chunk: int, size: int) -> int:
+    writer = BufferedWriter(dst)
+    data = bytes(chunk)
+    total = 0
+    while total < size:
+        count = min(chunk, size - total)
+        writer.write(data[:count])
+        total += count
+    writer.close()
+    return total
+
+
+def bench_copy_stream(src, dst, chunk: int, size: int) -> int:
+    return copy_stream(src, dst, chunk=chunk, max_chunk=chunk).transferred
+
+
+BENCHMARKS: Dict[str, Tuple[Callable[..., int], bool, bool]] = {
+    # name: (function, needs a source, needs a sink)
+    "read": (bench_read, True, False),
+    "blocking_read": (bench_blocking_read, True, False),
+    "skip": (bench_skip, True, False),
+    "blocking_skip": (bench_blocking_skip, True, False),
+    "write+check_write": (bench_check_write, False, True),
+    "blocking_write_and_flush": (bench_blocking_write_and_flush, False, True),
+    "splice": (bench_splice, True, True),
+    "blocking_splice": (bench_blocking_splice, True, True),
+    "sdk.BufferedReader.readinto": (bench_buffered_reader, True, False),
+    "sdk.BufferedWriter.write": (bench_buffered_writer, False, True),
+    "sdk.copy_stream": (bench_copy_stream, True, True),
+}
+
+
+class Transport:
+    """
+    Creates a source of `size` bytes and a sink, over files or pipes.
+    """
+
+    def __init__(self, kind: str, size: int, workdir: str) -> None:
+        self.kind = kind
+        self.size = size
+        self.path = os.path.join(workdir, "source.bin")
+        with open(self.path, "wb") as f:
+            f.write(os.urandom(min(size, 1024 * 1024)) * max(1, size // (1024 * 1024)))
+            f.truncate(size)
+        self._threads = []
+
+    def source(self) -> standin.FdInputStream:
+        if self.kind == "file":
+            return standin.FdInputStream(os.open(self.path, os.O_RDONLY))
+        read_fd, write_fd = os.pipe()
+        self._spawn(self._feed, write_fd)
+        return standin.FdInputStream(read_fd)
+
+    def sink(self) -> standin.FdOutputStream:
+        if self.kind == "file":
+            return standin.FdOutputStream(os.open(os.devnull, os.O_WRONLY))
+        read_fd, write_fd = os.pipe()
+        self._spawn(self._drain, read_fd)
+        return standin.FdOutputStream(write_fd)
+
+    def join(self) -> None:
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _spawn(self, target, fd: int) -> None:
+        thread = threading.Thread(target=target, args=(fd,), daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _feed(self, fd: int) -> None:
+        with open(self.path, "rb") as f:
+            while True:
+                data = f.read(1024 * 1024)
+                if not data:
+                    break
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+        os.close(fd)
+
+    def _drain(self, fd: int) -> None:
+        while os.read(fd, 1024 * 1024):
+            pass
+        os.close(fd)
+
+
+def run(transport: Transport, names, chunks) -> Iterator[dict]:
+    for name in names:
+        function, needs_source, needs_sink = BENCHMARKS[name]
+        for chunk in chunks:
+            src = transport.source() if needs_source else None
+            dst = transport.sink() if needs_sink else None
+            standin.calls.clear()
+            start = time.perf_counter_ns()
+            moved = function(src, dst, chunk, transport.size)
+            elapsed = time.perf_counter_ns() - start
+            host_calls = sum(standin.calls.values())
+            for stream in (src, dst):
+                if stream is not None:
+                    stream.__exit__(None, None, None)
+            transport.join()
+            mib = moved / (1024 * 1024)
+            yield {
+                "api": name,
+                "transport": transport.kind,
+                "chunk": chunk,
+                "bytes": moved,
+                "elapsed_ns": elapsed,
+                "mib_per_s": round(mib / (elapsed / 1e9), 2) if elapsed else None,
+                "host_calls": host_calls,
+                "host_calls_per_mib": round(host_calls / mib, 2) if mib else None,
+            }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stream throughput across chunk sizes and APIs.")
+    parser.add_argument("--size", type=float, default=16, help="MiB moved per measurement")
+    parser.add_argument("--transport", choices=["file", "pipe"], default="file")
+    parser.add_argument("--api", action="append", choices=sorted(BENCHMARKS), help="benchmark only these APIs")
+    parser.add_argument("--chunk", action="append", type=int, help="benchmark only these chunk sizes")
+    parser.add_argument("--table", action="store_true", help="print a table instead of JSON lines")
+    args = parser.parse_args()
+    standin.install()
+    size = int(args.size * 1024 * 1024)
+    with tempfile.TemporaryDirectory() as workdir:
+        transport = Transport(args.transport, size, workdir)
+        if args.table:
+            print(f"{'api':<28} {'chunk':>8} {'MiB/s':>10} {'calls/MiB':>10}")
+        for row in run(transport, args.api or list(BENCHMARKS), args.chunk or CHUNKS):
+            if args.table:
+                print(f"{row['api']:<28} {row['chunk']:>8} {row['mib_per_s']:>10} {row['host_calls_per_mib']:>10}")
+            else:
+                print(json.dumps(row, sort_keys=True), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,89 @@
+import time
+
+_loaded_ns = time.monotonic_ns()
+
+from collections.abc import Coroutine, Generator
+
 from .wit.exports import Run
+from . import lifecycle
+from . import shutdown
+from . import snapshot
+from . import stdio
 
 
 class RunHandler(Run):
+    call_exit = True
+    """Whether `run` ends by calling `exit.exit` after the shutdown pipeline."""
+
+    timing = None
+    """The `lifecycle.RunTiming` of the last run."""
+
     def run(self) -> None:
-        self.handle()
+        self.timing = timing = lifecycle.RunTiming.start()
+        stdio.install()
+        error = None
+        ok = True
+        try:
+            try:
+                if not snapshot.is_preinitialized(type(self)):
+                    with timing.phase("preinit"):
+                        snapshot.ensure(type(self))
+                with timing.phase("setup"):
+                    self.setup()
+                with timing.phase("handle"):
+                    result = self.handle()
+                    if isinstance(result, Coroutine):
+                        from .loop import run
+                        run(result)
+                    elif isinstance(result, Generator):
+                        from .tasks import run
+                        run(result)
+            finally:
+                with timing.phase("teardown"):
+                    self.teardown()
+        except SystemExit as exc:
+            # A requested exit, not a crash: `sys.exit()` or `sys.exit(0)`
+            # succeeds and any other code fails, without a traceback.
+            error = exc
+            ok = exc.code in (None, 0)
+        except BaseException as exc:
+            error = exc
+            ok = False
+            if self.call_exit:
+                # Nothing is printed once the instance has exited. Records
+                # logged before the crash go out ahead of the traceback.
+                try:
+                    shutdown.flush_logs()
+                except Exception:
+                    pass
+                import traceback
+                traceback.print_exc()
+        lifecycle.export(timing)
+        shutdown.run(ok, self.call_exit)
+        if error is not None:
+            raise error
+
+    @classmethod
+    def preinit(cls) -> None:
+        """
+        One-time initialization baked into the component when it is built
+        with `python -m test_sdk.build`: import modules, compile regexes and
+        templates, prepare header lists with `snapshot.header_list`, and keep
+        the results on the class or in module globals. Without
+        pre-initialization, it runs at the start of the first `run`.
+
+        It runs before the component can call the host, so it must not
+        create resources or read the clock, environment or stdin.
+        """
+
+    def setup(self):
+        pass
 
     def handle(self):
         pass
+
+    def teardown(self):
+        pass
+
+
+lifecycle.mark_imported(_loaded_ns)
@@ -0,0 +1,88 @@
+"""
+Reading an `IncomingBody` and its trailers.
+
+`IncomingBody.stream()` is a child resource: it must be dropped before the
+body is dropped or handed to `IncomingBody.finish`, and the trailers returned
+by `FutureTrailers.get` must in turn be dropped before the future.
+`IncomingBodyReader` owns all of them and releases them in that order, whether
+the body is read with `read`/`readline`, `for`, or `async for` under a
+`PollLoop`.
+"""
+from typing import List, Optional, Tuple
+
+from .wit.imports import wasi_http_types
+from .wit.types import Err
+from .reader import DEFAULT_BUFFER_SIZE, BufferedReader
+from .subscription import Subscription
+
+
+class IncomingBodyReader(BufferedReader):
+    """
+    A `BufferedReader` over the contents of an `IncomingBody`.
+
+    `close()` drops the stream's pollable, the stream and then the body.
+    `trailers()` (or `atrailers()`) drops the stream instead, finishes the
+    body and returns its trailers.
+    """
+
+    def __init__(self, body: wasi_http_types.IncomingBody, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        super().__init__(body.stream(), buffer_size)
+        self.body: Optional[wasi_http_types.IncomingBody] = body
+
+    def close(self) -> None:
+        """
+        Drop the stream's pollable, the stream and then the body.
+        """
+        body, self.body = self.body, None
+        if body is None:
+            return
+        try:
+            super().close()
+        finally:
+            body.__exit__(None, None, None)
+
+    def trailers(self) -> List[Tuple[str, bytes]]:
+        """
+        Drop the contents stream, finish the body and wait for its trailers.
+        Unread contents are discarded. Returns the trailer entries (empty
+        when there are none) and raises `Err(ErrorCode)` if the body could
+        not be received.
+        """
+        future = self._finish()
+        with Subscription(future) as subscription:
+            subscription.block()
+            return _entries(future)
+
+    async def atrailers(self) -> List[Tuple[str, bytes]]:
+        """
+        Like `trailers`, but waits on the running `PollLoop` instead of
+        blocking it.
+        """
+        from .loop import wait_ready
+        future = self._finish()
+        with Subscription(future) as subscription:
+            await wait_ready(subscription.pollable)
+            return _entries(future)
+
+    def _finish(self) -> wasi_http_types.FutureTrailers:
+        body, self.body = self.body, None
+        if body is None:
+            raise ValueError("body already closed")
+        super().close()
+        return wasi_http_types.IncomingBody.finish(body)
+
+
+def _entries(future: wasi_http_types.FutureTrailers) -> List[Tuple[str, bytes]]:
+    result = future.get()
+    if result is None:
+        raise RuntimeError("trailers not ready")
+    if isinstance(result, Err):
+        raise result
+    trailers = result.value
+    if isinstance(trailers, Err):
+        raise trailers
+    fields = trailers.value
+    if fields is None:
+        return []
+    with fields:
+        return fields.entries()
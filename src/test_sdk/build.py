@@ -0,0 +1,136 @@
+"""
+Build a component from a `RunHandler` application with componentize-py,
+pre-initialized.
+
+    python -m test_sdk.build [APP_DIR] [--output app.wasm] [--no-preinit]
+
+The build reads the `[preinit]` table of `componentize-py.toml` in the
+application directory:
+
+    [preinit]
+    handler = "app:Handler"        # the RunHandler subclass, required
+    modules = ["app_templates"]    # more modules to import into the snapshot
+    world = "test"
+    output = "app.wasm"
+    enabled = true
+
+and builds a generated entry module exporting `Run`. Pre-initialized, the
+entry module calls `snapshot.preinitialize` when it is imported, which
+componentize-py does before taking its snapshot, so the imports and
+`RunHandler.preinit` are baked into the component. Otherwise it imports
+nothing until `run`, which is the plain build the cold-start benchmark
+compares against.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import tomllib
+from typing import Any, Dict, List, Optional, Sequence
+
+
+CONFIG = "componentize-py.toml"
+ENTRY = "test_sdk_entry"
+
+_DEFAULTS: Dict[str, Any] = {
+    "modules": [],
+    "world": "test",
+    "output": "app.wasm",
+    "enabled": True,
+}
+
+_PREINIT_ENTRY = """\
+from test_sdk import snapshot
+
+Run = snapshot.preinitialize({handler!r}, {modules!r})
+"""
+
+_PLAIN_ENTRY = """\
+class Run:
+    def run(self):
+        from test_sdk import snapshot
+
+        snapshot.load({handler!r})().run()
+"""
+
+
+def read_config(app_dir: str) -> Dict[str, Any]:
+    """
+    The `[preinit]` table of `app_dir/componentize-py.toml`, with defaults.
+    """
+    config = dict(_DEFAULTS)
+    path = os.path.join(app_dir, CONFIG)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            config.update(tomllib.load(f).get("preinit", {}))
+    if "handler" not in config:
+        raise ValueError(f"{path}: [preinit] handler is not set")
+    return config
+
+
+def entry_source(handler: str, modules: Sequence[str] = (), preinit: bool = True) -> str:
+    """
+    The source of the entry module for `handler` (`"module:Class"`).
+    """
+    if preinit:
+        return _PREINIT_ENTRY.format(handler=handler, modules=list(modules))
+    return _PLAIN_ENTRY.format(handler=handler)
+
+
+def command(entry_dir: str, app_dir: str, output: str, world: str, componentize_py: str = "componentize-py") -> List[str]:
+    """
+    The componentize-py command line building the entry module in
+    `entry_dir` against the SDK's WIT world `world`.
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    return [
+        componentize_py,
+        "-d", os.path.join(package_dir, "wit"),
+        "-w", world,
+        "componentize",
+        "-p", entry_dir,
+        "-p", app_dir,
+        "-p", os.path.dirname(package_dir),
+        ENTRY,
+        "-o", output,
+    ]
+
+
+def build(app_dir: str = ".", output: Optional[str] = None, preinit: Optional[bool] = None, componentize_py: str = "componentize-py", dry_run: bool = False) -> str:
+    """
+    Build the application in `app_dir` and return the path of the
+    component. `output` and `preinit` override the configuration.
+    """
+    app_dir = os.path.abspath(app_dir)
+    config = read_config(app_dir)
+    if preinit is None:
+        preinit = config["enabled"]
+    output = os.path.abspath(output or os.path.join(app_dir, config["output"]))
+    with tempfile.TemporaryDirectory() as entry_dir:
+        with open(os.path.join(entry_dir, f"{ENTRY}.py"), "w") as f:
+            f.write(entry_source(config["handler"], config["modules"], preinit))
+        argv = command(entry_dir, app_dir, output, config["world"], componentize_py)
+        if dry_run:
+            print(" ".join(argv))
+        else:
+            subprocess.run(argv, check=True)
+    return output
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m test_sdk.build", description="Build a pre-initialized component.")
+    parser.add_argument("app_dir", nargs="?", default=".", help=f"directory with the application and its {CONFIG}")
+    parser.add_argument("-o", "--output", help="path of the component")
+    parser.add_argument("--no-preinit", dest="preinit", action="store_false", default=None, help="defer imports and preinit to the first run")
+    parser.add_argument("--componentize-py", default="componentize-py", help="componentize-py executable")
+    parser.add_argument("--dry-run", action="store_true", help="print the componentize-py command instead of running it")
+    args = parser.parse_args()
+    try:
+        build(args.app_dir, args.output, args.preinit, args.componentize_py, args.dry_run)
+    except (ValueError, subprocess.CalledProcessError) as exc:
+        sys.exit(f"build failed: {exc}")
+
+
+if __name__ == "__main__":
+    main()
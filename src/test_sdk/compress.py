@@ -0,0 +1,302 @@
+"""
+Streaming zlib/gzip stages over `streams.InputStream` and `OutputStream`.
+
+`CompressWriter` compresses into an output stream (`OutgoingBody.write()`,
+say) through a `BufferedWriter`, and `DecompressReader` decompresses an input
+stream (`IncomingBody.stream()`, `Descriptor.read_via_stream(...)`) on
+demand. Both hold at most a few buffers' worth of data: the compressor's
+output is handed to the host at the writer's high-water mark, and the
+decompressor produces at most the requested size per call, keeping the rest
+of its input as `unconsumed_tail`.
+
+Payloads that are already compressed can be passed through unchanged, either
+explicitly or by looking at their first bytes.
+"""
+import zlib
+from typing import Iterator, List, Optional, Union
+
+from .wit.imports import streams
+from .wit.types import Err
+from .reader import DEFAULT_BUFFER_SIZE
+from .subscription import Subscription
+from .writer import DEFAULT_HIGH_WATER, BufferedWriter
+
+
+GZIP = "gzip"
+ZLIB = "zlib"
+DEFLATE = "deflate"
+"""Raw deflate, without a header or trailer."""
+AUTO = "auto"
+"""Decompress gzip or zlib data, and pass anything else through."""
+
+_WBITS = {GZIP: 31, ZLIB: 15, DEFLATE: -15, AUTO: 47}
+_GZIP_MAGIC = b"\x1f\x8b"
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def is_compressed(prefix: Buffer) -> bool:
+    """
+    Whether `prefix`, the first two or more bytes of a payload, starts a
+    gzip member or a zlib stream.
+    """
+    if len(prefix) < 2:
+        return False
+    if prefix[0] == 0x1F and prefix[1] == 0x8B:
+        return True
+    return prefix[0] & 0x0F == 8 and prefix[0] >> 4 <= 7 and (prefix[0] << 8 | prefix[1]) % 31 == 0
+
+
+class CompressWriter:
+    """
+    Compressed writes to an `OutputStream`.
+
+    The writer owns `stream`: `close()` ends the compressed stream, then
+    flushes and drops `stream`. With `passthrough=True` data is written
+    unchanged; with `passthrough=None` it is if its first bytes are already
+    gzip or zlib.
+    """
+
+    def __init__(self, stream: streams.OutputStream, format: str = GZIP, level: int = 6, high_water: int = DEFAULT_HIGH_WATER, passthrough: Optional[bool] = False) -> None:
+        if format not in (GZIP, ZLIB, DEFLATE):
+            raise ValueError(f"unknown format {format!r}")
+        self.format = format
+        self.level = level
+        self.passthrough = passthrough
+        self.bytes_in = 0
+        self._writer = BufferedWriter(stream, high_water)
+        self._compressor = None if passthrough is not False else self._compressobj()
+        self._prefix = b""
+
+    @property
+    def bytes_out(self) -> int:
+        """
+        Bytes produced so far, including those not yet handed to the host.
+        """
+        return self._writer.bytes_written + self._writer.buffered
+
+    @property
+    def closed(self) -> bool:
+        return self._writer.closed
+
+    def write(self, data: Buffer) -> int:
+        """
+        Compress `data` (or pass it through). Returns `len(data)`.
+        """
+        if self._writer.closed:
+            raise ValueError("write to closed CompressWriter")
+        with memoryview(data) as view:
+            size = view.nbytes
+        self.bytes_in += size
+        if self.passthrough is None:
+            self._prefix += data
+            if len(self._prefix) < 2:
+                return size
+            self._decide()
+            data, self._prefix = self._prefix, b""
+        if self._compressor is None:
+            self._writer.write(data)
+        else:
+            self._writer.write(self._compressor.compress(data))
+        return size
+
+    def flush(self) -> None:
+        """
+        Emit everything written so far as complete compressed blocks (a zlib
+        sync flush), hand it to the host and wait for the host to flush.
+        """
+        if self._compressor is not None:
+            self._writer.write(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+        self._writer.flush()
+
+    def close(self) -> None:
+        """
+        Finish the compressed stream, then flush and drop the output stream.
+        """
+        if self._writer.closed:
+            return
+        try:
+            if self.passthrough is None:
+                self._decide()
+                prefix, self._prefix = self._prefix, b""
+                if self._compressor is None:
+                    self._writer.write(prefix)
+                else:
+                    self._writer.write(self._compressor.compress(prefix))
+            if self._compressor is not None:
+                self._writer.write(self._compressor.flush(zlib.Z_FINISH))
+        finally:
+            self._writer.close()
+
+    def __enter__(self) -> "CompressWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _decide(self) -> None:
+        # Settles the pass-through decision from the buffered prefix.
+        self.passthrough = is_compressed(self._prefix)
+        if not self.passthrough:
+            self._compressor = self._compressobj()
+
+    def _compressobj(self) -> "zlib._Compress":
+        return zlib.compressobj(self.level, zlib.DEFLATED, _WBITS[self.format])
+
+
+class DecompressReader:
+    """
+    Decompressed reads from an `InputStream`.
+
+    The reader owns `stream`: `close()` drops the stream's pollable and then
+    the stream. Concatenated gzip members are decompressed one after the
+    other; other data after the end of the compressed stream, such as zero
+    padding, is ignored. With `format=AUTO`, input that is neither gzip nor zlib is
+    returned unchanged.
+    """
+
+    def __init__(self, stream: streams.InputStream, format: str = AUTO, read_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        if format not in _WBITS:
+            raise ValueError(f"unknown format {format!r}")
+        if read_size <= 0:
+            raise ValueError("read_size must be positive")
+        self.stream = stream
+        self.format = format
+        self.read_size = read_size
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.passthrough = False
+        self._subscription = Subscription(stream)
+        self._wbits = _WBITS[format]
+        self._decompressor = None if format == AUTO else zlib.decompressobj(self._wbits)
+        self._input = b""
+        self._eof = False
+        # With `AUTO`, whether the payload turned out to be gzip.
+        self._gzip = False
+
+    def read(self, n: int = -1) -> bytes:
+        """
+        Return up to `n` decompressed bytes (at least one unless the stream
+        has ended), or everything until the end when `n` is negative.
+        Raises `EOFError` if the stream ends inside a compressed payload.
+        """
+        if n < 0:
+            chunks: List[bytes] = []
+            while True:
+                chunk = self.read(self.read_size)
+                if not chunk:
+                    return b"".join(chunks)
+                chunks.append(chunk)
+        if not n:
+            return b""
+        while True:
+            if self._input:
+                data = self._produce(n)
+                if data:
+                    self.bytes_out += len(data)
+                    return data
+                continue
+            if self._eof:
+                if self._decompressor is not None and not self._decompressor.eof and self.bytes_in:
+                    raise EOFError("compressed stream ended before the end-of-stream marker")
+                return b""
+            self._fill()
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self
+
+    def __next__(self) -> bytes:
+        data = self.read(self.read_size)
+        if not data:
+            raise StopIteration
+        return data
+
+    def close(self) -> None:
+        """
+        Drop the stream's pollable, then the stream.
+        """
+        self._subscription.close()
+
+    def __enter__(self) -> "DecompressReader":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _produce(self, n: int) -> bytes:
+        # Turns buffered input into up to `n` bytes of output.
+        if self._decompressor is None and not self.passthrough:
+            if len(self._input) < 2 and not self._eof:
+                self._fill()
+                return b""
+            if is_compressed(self._input):
+                self._gzip = self._input.startswith(_GZIP_MAGIC)
+                self._decompressor = zlib.decompressobj(self._wbits)
+            else:
+                self.passthrough = True
+        if self.passthrough:
+            data, self._input = self._input[:n], self._input[n:]
+            return data
+        decompressor = self._decompressor
+        assert decompressor is not None
+        if decompressor.eof:
+            # Only gzip allows another stream (member) to follow.
+            gzip = self.format == GZIP or self.format == AUTO and self._gzip
+            if gzip and len(self._input) < 2 and not self._eof:
+                self._fill()
+                return b""
+            if not gzip or not self._input.startswith(_GZIP_MAGIC):
+                self._input = b""
+                return b""
+            decompressor = self._decompressor = zlib.decompressobj(self._wbits)
+        data = decompressor.decompress(self._input, n)
+        self._input = decompressor.unconsumed_tail
+        if decompressor.eof:
+            # The leftover input is all in `unused_data`.
+            self._input = decompressor.unused_data
+        return data
+
+    def _fill(self) -> None:
+        while True:
+            try:
+                data = self.stream.read(self.read_size)
+            except Err as error:
+                if isinstance(error.value, streams.StreamError_Closed):
+                    self._eof = True
+                    return
+                raise
+            if data:
+                self.bytes_in += len(data)
+                self._input += data
+                return
+            self._subscription.block()
+
+
+def compress_stream(src: streams.InputStream, dst: streams.OutputStream, format: str = GZIP, level: int = 6, passthrough: Optional[bool] = False, read_size: int = DEFAULT_BUFFER_SIZE) -> int:
+    """
+    Compress `src` into `dst` until `src` ends. Returns the bytes read.
+    Both streams are closed.
+    """
+    with Subscription(src) as subscription, CompressWriter(dst, format, level, passthrough=passthrough) as writer:
+        while True:
+            try:
+                data = src.read(read_size)
+            except Err as error:
+                if isinstance(error.value, streams.StreamError_Closed):
+                    return writer.bytes_in
+                raise
+            if data:
+                writer.write(data)
+            else:
+                subscription.block()
+
+
+def decompress_stream(src: streams.InputStream, dst: streams.OutputStream, format: str = AUTO, read_size: int = DEFAULT_BUFFER_SIZE) -> int:
+    """
+    Decompress `src` into `dst` until `src` ends. Returns the bytes written.
+    Both streams are closed.
+    """
+    with DecompressReader(src, format, read_size) as reader, BufferedWriter(dst) as writer:
+        for chunk in reader:
+            writer.write(chunk)
+        return reader.bytes_out
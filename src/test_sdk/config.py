@@ -0,0 +1,268 @@
+"""
+Typed access to the environment.
+
+`environment.get_environment()` is a host call returning a fresh list of
+pairs. `environ()` makes that call once, indexes the result into a dict and
+returns it as a `Config`, which converts values to `int`, `bool`, durations
+and sizes on first access and caches the result. `Config.prefix("APP_")` is
+the group of variables starting with `APP_`, with the prefix removed.
+
+Tests can replace the snapshot with `override(...)`.
+"""
+import math
+import re
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional, Tuple, TypeVar, Union
+
+from .wit.imports import environment
+
+
+T = TypeVar("T")
+
+_MISSING: Any = object()
+
+_TRUE = frozenset(("1", "true", "yes", "on", "y", "t"))
+_FALSE = frozenset(("0", "false", "no", "off", "n", "f", ""))
+
+_DURATION_UNITS = {
+    "ns": 1,
+    "us": 1_000,
+    "µs": 1_000,
+    "ms": 1_000_000,
+    "s": 1_000_000_000,
+    "m": 60_000_000_000,
+    "h": 3_600_000_000_000,
+    "d": 86_400_000_000_000,
+}
+_NUMBER = r"([0-9]+(?:\.[0-9]*)?|\.[0-9]+)"
+_DURATION_NUMBER = re.compile(_NUMBER)
+_DURATION_PART = re.compile(_NUMBER + r"\s*(ns|us|µs|ms|s|m|h|d)")
+
+_SIZE_UNITS = {
+    "": 1,
+    "b": 1,
+    "k": 1024, "kb": 1000, "kib": 1024,
+    "m": 1024 ** 2, "mb": 1000 ** 2, "mib": 1024 ** 2,
+    "g": 1024 ** 3, "gb": 1000 ** 3, "gib": 1024 ** 3,
+    "t": 1024 ** 4, "tb": 1000 ** 4, "tib": 1024 ** 4,
+}
+_SIZE = re.compile(_NUMBER + r"\s*([a-z]*)")
+
+
+class ConfigError(ValueError):
+    """
+    A variable is missing or cannot be converted to the requested type.
+    """
+
+
+def parse_bool(value: str) -> bool:
+    """
+    `1`/`true`/`yes`/`on` or `0`/`false`/`no`/`off` (and the empty
+    string), case-insensitively.
+    """
+    lowered = value.strip().lower()
+    if lowered in _TRUE:
+        return True
+    if lowered in _FALSE:
+        return False
+    raise ValueError(f"not a boolean: {value!r}")
+
+
+def parse_duration(value: str) -> int:
+    """
+    A non-negative duration such as `250ms`, `1m30s` or `1.5h`, in
+    nanoseconds. A bare number is in seconds. Signs, exponents and
+    underscores are not accepted.
+    """
+    text = value.strip()
+    if _DURATION_NUMBER.fullmatch(text):
+        total = float(text) * 1_000_000_000
+    else:
+        total = 0.0
+        position = 0
+        for match in _DURATION_PART.finditer(text):
+            if match.start() != position:
+                break
+            total += float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+            position = match.end()
+        if not text or position != len(text):
+            raise ValueError(f"not a duration: {value!r}")
+    if not math.isfinite(total):
+        raise ValueError(f"not a finite duration: {value!r}")
+    return round(total)
+
+
+def parse_size(value: str) -> int:
+    """
+    A size in bytes such as `512`, `64KiB`, `10MB` or `1.5G`. `KB`, `MB`,
+    ... are powers of 1000; `K`, `KiB`, `M`, `MiB`, ... powers of 1024.
+    """
+    match = _SIZE.fullmatch(value.strip().lower())
+    if match is None or match.group(2) not in _SIZE_UNITS:
+        raise ValueError(f"not a size: {value!r}")
+    size = float(match.group(1)) * _SIZE_UNITS[match.group(2)]
+    if not math.isfinite(size):
+        raise ValueError(f"not a finite size: {value!r}")
+    return round(size)
+
+
+class Config(Mapping[str, str]):
+    """
+    A read-only mapping of variable names to string values, with typed
+    getters whose conversions are cached.
+    """
+
+    def __init__(self, values: Union[Mapping[str, str], Iterable[Tuple[str, str]]] = ()) -> None:
+        self._values: Dict[str, str] = dict(values)
+        self._converted: Dict[Tuple[str, Callable[[str], Any]], Any] = {}
+        self._prefixes: Dict[str, "Config"] = {}
+
+    def __getitem__(self, name: str) -> str:
+        return self._values[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"Config({self._values!r})"
+
+    def require(self, name: str) -> str:
+        """
+        Return the value of `name`, raising `ConfigError` if it is not set.
+        """
+        try:
+            return self._values[name]
+        except KeyError:
+            raise ConfigError(f"{name} is not set") from None
+
+    def get_as(self, name: str, convert: Callable[[str], T], default: Any = _MISSING) -> T:
+        """
+        Return `convert(value)` for `name`, computed once per name and
+        converter. Returns `default` when `name` is not set, or raises
+        `ConfigError` if there is no default; conversion errors are raised
+        as `ConfigError` too.
+        """
+        key = (name, convert)
+        try:
+            return self._converted[key]
+        except KeyError:
+            pass
+        value = self._values.get(name)
+        if value is None:
+            if default is _MISSING:
+                raise ConfigError(f"{name} is not set")
+            return default
+        try:
+            result = convert(value)
+        except ValueError as exc:
+            raise ConfigError(f"{name}: {exc}") from None
+        self._converted[key] = result
+        return result
+
+    def get_int(self, name: str, default: Any = _MISSING) -> int:
+        return self.get_as(name, _int, default)
+
+    def get_float(self, name: str, default: Any = _MISSING) -> float:
+        return self.get_as(name, float, default)
+
+    def get_bool(self, name: str, default: Any = _MISSING) -> bool:
+        return self.get_as(name, parse_bool, default)
+
+    def get_duration(self, name: str, default: Any = _MISSING) -> int:
+        """
+        The duration in `name` in nanoseconds, see `parse_duration`.
+        """
+        return self.get_as(name, parse_duration, default)
+
+    def get_size(self, name: str, default: Any = _MISSING) -> int:
+        """
+        The size in `name` in bytes, see `parse_size`.
+        """
+        return self.get_as(name, parse_size, default)
+
+    def get_list(self, name: str, default: Any = _MISSING, separator: str = ",") -> Tuple[str, ...]:
+        """
+        The `separator`-separated items in `name`, stripped, without empty
+        items.
+        """
+        value = self._values.get(name)
+        if value is None:
+            if default is _MISSING:
+                raise ConfigError(f"{name} is not set")
+            return default
+        return tuple(item.strip() for item in value.split(separator) if item.strip())
+
+    def prefix(self, prefix: str) -> "Config":
+        """
+        The variables whose names start with `prefix`, with `prefix`
+        removed. The view is built once per prefix.
+        """
+        view = self._prefixes.get(prefix)
+        if view is None:
+            size = len(prefix)
+            view = self._prefixes[prefix] = Config(
+                (name[size:], value) for name, value in self._values.items() if name.startswith(prefix)
+            )
+        return view
+
+
+def _int(value: str) -> int:
+    # Decimal, or `0x`/`0o`/`0b` prefixed.
+    try:
+        return int(value)
+    except ValueError:
+        return int(value.strip(), 0)
+
+
+_environ: Optional[Config] = None
+
+
+def environ() -> Config:
+    """
+    Return the environment as a `Config`, taking the snapshot on first use.
+    """
+    global _environ
+    if _environ is None:
+        _environ = Config(environment.get_environment())
+    return _environ
+
+
+def reset() -> None:
+    """
+    Forget the snapshot; the next `environ()` asks the host again.
+    """
+    global _environ
+    _environ = None
+
+
+@contextmanager
+def override(values: Optional[Mapping[str, Optional[str]]] = None, clear: bool = False, **kwargs: Optional[str]) -> Iterator[Config]:
+    """
+    Replace the environment seen by `environ()` inside a `with` block.
+
+    Variables in `values` and `kwargs` are set on top of the current
+    environment (or an empty one with `clear=True`); a value of `None`
+    removes the variable. Outside a component, where the host environment
+    is unavailable, the current environment is empty.
+    """
+    global _environ
+    previous = _environ
+    merged: Dict[str, str] = {}
+    if not clear:
+        try:
+            merged.update(environ())
+        except NotImplementedError:
+            pass
+    for name, value in {**(values or {}), **kwargs}.items():
+        if value is None:
+            merged.pop(name, None)
+        else:
+            merged[name] = value
+    _environ = Config(merged)
+    try:
+        yield _environ
+    finally:
+        _environ = previous
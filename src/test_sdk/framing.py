@@ -0,0 +1,305 @@
+"""
+Incremental record framing over `streams.InputStream` and `OutputStream`.
+
+A decoder accumulates chunks in one `bytearray` and yields each complete
+record as a `memoryview` slice of it, without copying. Scanning resumes where
+the previous scan stopped, so every byte is examined once however the records
+are split across chunks. `records(stream, decoder)` drives a decoder from a
+stream; `feed` and iteration can also be used directly.
+
+A record stays valid for as long as it is referenced: when the decoder needs
+to move or grow its buffer while records still point into it, it moves to a
+new buffer and leaves the old one to them.
+
+The encoders write through a `BufferedWriter`, which hands the bytes to the
+host within `check_write` permits.
+"""
+import json
+from typing import Any, Iterator, Optional, Union
+
+from .wit.imports import streams
+from .wit.types import Err
+from .reader import DEFAULT_BUFFER_SIZE, IncompleteRead
+from .subscription import Subscription
+from .writer import BufferedWriter
+
+
+DEFAULT_MAX_RECORD = 16 * 1024 * 1024
+
+_WHITESPACE = b" \t\r"
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class FramingError(ValueError):
+    """
+    The input is not valid for the framing, or a record exceeds
+    `max_record`.
+    """
+
+
+class Decoder:
+    """
+    Base class of the record decoders. Subclasses implement `_next`.
+    """
+
+    def __init__(self, max_record: int = DEFAULT_MAX_RECORD) -> None:
+        if max_record <= 0:
+            raise ValueError("max_record must be positive")
+        self.max_record = max_record
+        self._buf = bytearray()
+        self._start = 0
+        self._scanned = 0
+
+    @property
+    def buffered(self) -> int:
+        """
+        Number of bytes received but not yet returned in a record.
+        """
+        return len(self._buf) - self._start
+
+    def feed(self, data: Buffer) -> None:
+        """
+        Append `data` to the input.
+        """
+        try:
+            del self._buf[:self._start]
+            self._buf += data
+        except BufferError:
+            # Records returned earlier still point into the buffer.
+            self._buf = self._buf[self._start:] + data
+        self._scanned -= self._start
+        self._start = 0
+
+    def __iter__(self) -> Iterator[memoryview]:
+        """
+        Yield every complete record received so far.
+        """
+        while True:
+            record = self._next()
+            if record is None:
+                return
+            yield record
+
+    def finish(self) -> Iterator[memoryview]:
+        """
+        Signal the end of the input: yield the records still buffered, then
+        raise `IncompleteRead` if a partial record remains.
+        """
+        yield from self
+        if self._start < len(self._buf):
+            raise IncompleteRead(bytes(self._buf[self._start:]), self._expected())
+
+    def _next(self) -> Optional[memoryview]:
+        # Returns the next complete record and consumes it, or `None` when
+        # more input is needed.
+        raise NotImplementedError
+
+    def _expected(self) -> Optional[int]:
+        # The size of the partial record at the end of input, when known.
+        return None
+
+    def _take(self, start: int, end: int, consumed: int) -> memoryview:
+        with memoryview(self._buf) as view:
+            record = view[start:end]
+        self._start = self._scanned = consumed
+        return record
+
+
+class LineDecoder(Decoder):
+    """
+    Records separated by `delimiter`, returned without it unless `keepends`.
+    A final record without a delimiter is returned at the end of input.
+    """
+
+    def __init__(self, delimiter: bytes = b"\n", keepends: bool = False, max_record: int = DEFAULT_MAX_RECORD) -> None:
+        if not delimiter:
+            raise ValueError("delimiter must not be empty")
+        super().__init__(max_record)
+        self.delimiter = delimiter
+        self.keepends = keepends
+
+    def finish(self) -> Iterator[memoryview]:
+        yield from self
+        if self._start < len(self._buf):
+            end = len(self._buf)
+            record = self._filter(self._take(self._start, end, end))
+            if record is not None:
+                yield record
+
+    def _next(self) -> Optional[memoryview]:
+        while True:
+            start = self._start
+            index = self._buf.find(self.delimiter, self._scanned)
+            if index < 0:
+                if len(self._buf) - start > self.max_record:
+                    raise FramingError(f"no delimiter within {self.max_record} bytes")
+                self._scanned = max(start, len(self._buf) - len(self.delimiter) + 1)
+                return None
+            if index - start > self.max_record:
+                raise FramingError(f"record of {index - start} bytes exceeds {self.max_record}")
+            consumed = index + len(self.delimiter)
+            record = self._filter(self._take(start, consumed if self.keepends else index, consumed))
+            if record is not None:
+                return record
+
+    def _filter(self, record: memoryview) -> Optional[memoryview]:
+        # Returns the record to yield, or `None` to skip it.
+        return record
+
+
+class NDJSONDecoder(LineDecoder):
+    """
+    Newline-delimited JSON: one document per line. Blank lines are skipped
+    and a trailing `\\r` is dropped; decode a record with
+    `json.loads(bytes(record))`.
+    """
+
+    def __init__(self, max_record: int = DEFAULT_MAX_RECORD) -> None:
+        super().__init__(b"\n", False, max_record)
+
+    def _filter(self, record: memoryview) -> Optional[memoryview]:
+        if len(record) and record[-1] == 0x0D:
+            record = record[:-1]
+        for byte in record:
+            if byte not in _WHITESPACE:
+                return record
+        return None
+
+
+class LengthPrefixedDecoder(Decoder):
+    """
+    Records preceded by their length as an unsigned 32-bit big-endian
+    integer.
+    """
+
+    def _next(self) -> Optional[memoryview]:
+        start = self._start
+        if len(self._buf) - start < 4:
+            return None
+        length = int.from_bytes(self._buf[start:start + 4], "big")
+        if length > self.max_record:
+            raise FramingError(f"record of {length} bytes exceeds {self.max_record}")
+        end = start + 4 + length
+        if len(self._buf) < end:
+            return None
+        return self._take(start + 4, end, end)
+
+    def _expected(self) -> Optional[int]:
+        if len(self._buf) - self._start < 4:
+            return None
+        return 4 + int.from_bytes(self._buf[self._start:self._start + 4], "big")
+
+
+class NetstringDecoder(Decoder):
+    """
+    Netstrings: `<length>:<data>,` with the length in decimal.
+    """
+
+    def __init__(self, max_record: int = DEFAULT_MAX_RECORD) -> None:
+        super().__init__(max_record)
+        self._digits = len(str(max_record))
+        # Offset and length of the payload once its header is parsed.
+        self._payload: Optional[int] = None
+        self._length = 0
+
+    def _next(self) -> Optional[memoryview]:
+        if self._payload is None and not self._header():
+            return None
+        assert self._payload is not None
+        end = self._payload + self._length
+        if len(self._buf) <= end:
+            return None
+        if self._buf[end] != 0x2C:
+            raise FramingError("netstring not terminated by ','")
+        payload, self._payload = self._payload, None
+        return self._take(payload, end, end + 1)
+
+    def _header(self) -> bool:
+        start = self._start
+        colon = self._buf.find(b":", self._scanned, start + self._digits + 1)
+        if colon < 0:
+            if len(self._buf) - start > self._digits:
+                raise FramingError(f"netstring length longer than {self._digits} digits")
+            self._scanned = len(self._buf)
+            return False
+        digits = self._buf[start:colon]
+        if not digits.isdigit() or (len(digits) > 1 and digits[0] == 0x30):
+            raise FramingError(f"invalid netstring length {bytes(digits)!r}")
+        length = int(digits)
+        if length > self.max_record:
+            raise FramingError(f"record of {length} bytes exceeds {self.max_record}")
+        self._payload = colon + 1
+        self._length = length
+        return True
+
+    def feed(self, data: Buffer) -> None:
+        start = self._start
+        super().feed(data)
+        if self._payload is not None:
+            self._payload -= start
+
+    def _expected(self) -> Optional[int]:
+        if self._payload is None:
+            return None
+        return self._payload - self._start + self._length + 1
+
+
+def records(stream: streams.InputStream, decoder: Decoder, read_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[memoryview]:
+    """
+    Read `stream` until it ends, yielding each record `decoder` completes.
+    Waits on the stream's pollable when no data is ready. The stream is not
+    closed.
+    """
+    subscription = Subscription(stream)
+    try:
+        while True:
+            try:
+                data = stream.read(read_size)
+            except Err as error:
+                if isinstance(error.value, streams.StreamError_Closed):
+                    break
+                raise
+            if not data:
+                subscription.block()
+                continue
+            decoder.feed(data)
+            yield from decoder
+        yield from decoder.finish()
+    finally:
+        subscription.release()
+
+
+def write_line(writer: BufferedWriter, record: Buffer, delimiter: bytes = b"\n") -> int:
+    """
+    Write `record` followed by `delimiter`. Returns the bytes written.
+    """
+    return writer.write(record) + writer.write(delimiter)
+
+
+def write_json(writer: BufferedWriter, value: Any) -> int:
+    """
+    Write `value` as one line of newline-delimited JSON.
+    """
+    return writer.write(json.dumps(value, separators=(",", ":")).encode() + b"\n")
+
+
+def write_length_prefixed(writer: BufferedWriter, record: Buffer) -> int:
+    """
+    Write `record` preceded by its length as a u32 big-endian integer.
+    """
+    with memoryview(record) as view:
+        length = view.nbytes
+    if length > 0xFFFFFFFF:
+        raise FramingError(f"record of {length} bytes does not fit a u32 length")
+    return writer.write(length.to_bytes(4, "big")) + writer.write(record)
+
+
+def write_netstring(writer: BufferedWriter, record: Buffer) -> int:
+    """
+    Write `record` as a netstring.
+    """
+    with memoryview(record) as view:
+        length = view.nbytes
+    return writer.write(b"%d:" % length) + writer.write(record) + writer.write(b",")
+
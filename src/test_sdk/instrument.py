@@ -0,0 +1,202 @@
+"""
+Opt-in instrumentation of the SDK's poll-driven scheduling.
+
+After `enable()`, `PollLoop`, `TaskGroup` and every `PollSet.wait` record
+per-iteration wall time, time blocked in `poll.poll`, ready and registered
+pollable counts and the slowest callbacks, all measured with
+`monotonic_clock.now()`. `RunHandler.run` writes a summary to stderr when it
+finishes; `enable(json=True)` makes that summary a single JSON line.
+
+When instrumentation is disabled, the only cost is one `recorder is None`
+check per iteration.
+"""
+import heapq
+from typing import Any, Dict, List, Optional, Tuple
+
+from .wit.imports import monotonic_clock
+from .wit.imports import stderr
+from .wit.imports import streams
+
+
+class LoopStats:
+    """
+    Counters collected while instrumentation is enabled.
+    """
+
+    def __init__(self, top: int = 10, json: bool = False) -> None:
+        self.top = top
+        self.json = json
+        self.started = monotonic_clock.now()
+        self.iterations = 0
+        self.iteration_ns = 0
+        self.max_iteration_ns = 0
+        self.histogram: Dict[int, int] = {}
+        self.polls = 0
+        self.blocked_ns = 0
+        self.ready = 0
+        self.max_ready = 0
+        self.registered = 0
+        self.max_registered = 0
+        self.callbacks = 0
+        self.callback_ns = 0
+        self.slowest: List[Tuple[int, int, Any]] = []
+        self.phases: Dict[str, int] = {}
+        self._iteration_starts: List[int] = []
+
+    def begin_iteration(self) -> None:
+        self._iteration_starts.append(monotonic_clock.now())
+
+    def end_iteration(self) -> None:
+        # A scheduler nested inside a callback (say, a TaskGroup joined from
+        # a coroutine) runs its iterations within the outer one; only the
+        # outermost iterations are counted so wall time is not counted twice.
+        if not self._iteration_starts:
+            return
+        start = self._iteration_starts.pop()
+        if self._iteration_starts:
+            return
+        elapsed = monotonic_clock.now() - start
+        self.iterations += 1
+        self.iteration_ns += elapsed
+        if elapsed > self.max_iteration_ns:
+            self.max_iteration_ns = elapsed
+        bucket = elapsed.bit_length()
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def record_poll(self, blocked_ns: int, ready: int, registered: int) -> None:
+        self.polls += 1
+        self.blocked_ns += blocked_ns
+        self.ready += ready
+        self.registered += registered
+        if ready > self.max_ready:
+            self.max_ready = ready
+        if registered > self.max_registered:
+            self.max_registered = registered
+
+    def record_callback(self, elapsed_ns: int, label: Any) -> None:
+        self.callbacks += 1
+        self.callback_ns += elapsed_ns
+        if self.top <= 0:
+            return
+        entry = (elapsed_ns, self.callbacks, label)
+        if len(self.slowest) < self.top:
+            heapq.heappush(self.slowest, entry)
+        elif elapsed_ns > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def record_phase(self, name: str, elapsed_ns: int) -> None:
+        self.phases[name] = self.phases.get(name, 0) + elapsed_ns
+
+    def percentile(self, fraction: float) -> int:
+        """
+        Upper bound, in nanoseconds, of the power-of-two bucket holding the
+        given fraction of iterations.
+        """
+        if not self.iterations:
+            return 0
+        wanted = fraction * self.iterations
+        seen = 0
+        for bucket in sorted(self.histogram):
+            seen += self.histogram[bucket]
+            if seen >= wanted:
+                return min((1 << bucket) - 1, self.max_iteration_ns)
+        return self.max_iteration_ns
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "wall_ns": monotonic_clock.now() - self.started,
+            "iterations": self.iterations,
+            "iteration_ns": self.iteration_ns,
+            "iteration_p50_ns": self.percentile(0.5),
+            "iteration_p99_ns": self.percentile(0.99),
+            "iteration_max_ns": self.max_iteration_ns,
+            "polls": self.polls,
+            "blocked_ns": self.blocked_ns,
+            "callbacks": self.callbacks,
+            "callback_ns": self.callback_ns,
+            "ready_mean": self.ready / self.polls if self.polls else 0.0,
+            "ready_max": self.max_ready,
+            "registered_mean": self.registered / self.polls if self.polls else 0.0,
+            "registered_max": self.max_registered,
+            "slowest_callbacks": [
+                {"ns": elapsed, "callback": _label(label)}
+                for elapsed, _, label in sorted(self.slowest, reverse=True)
+            ],
+            "phases_ns": dict(self.phases),
+        }
+
+    def format(self) -> str:
+        if self.json:
+            import json
+            return json.dumps({"test_sdk.instrument": self.summary()}) + "\n"
+        s = self.summary()
+        busy = s["iteration_ns"] - s["blocked_ns"]
+        share = 100.0 * s["blocked_ns"] / s["iteration_ns"] if s["iteration_ns"] else 0.0
+        lines = [
+            f"test_sdk: {s['iterations']} iterations in {_ms(s['iteration_ns'])}"
+            f" ({_ms(s['blocked_ns'])} blocked in poll, {share:.1f}%; {_ms(busy)} in Python)",
+            f"  iteration: p50 <= {_ms(s['iteration_p50_ns'])}, p99 <= {_ms(s['iteration_p99_ns'])},"
+            f" max {_ms(s['iteration_max_ns'])}",
+            f"  pollables per wait: {s['registered_mean']:.1f} registered (max {s['registered_max']}),"
+            f" {s['ready_mean']:.1f} ready (max {s['ready_max']})",
+            f"  callbacks: {s['callbacks']} in {_ms(s['callback_ns'])}",
+        ]
+        for entry in s["slowest_callbacks"]:
+            lines.append(f"    {_ms(entry['ns']):>10}  {entry['callback']}")
+        if s["phases_ns"]:
+            lines.append("  phases: " + ", ".join(f"{name} {_ms(ns)}" for name, ns in s["phases_ns"].items()))
+        return "\n".join(lines) + "\n"
+
+
+recorder: Optional[LoopStats] = None
+"""The active `LoopStats`, or `None` while instrumentation is disabled."""
+
+
+def enable(json: bool = False, top: int = 10) -> LoopStats:
+    """
+    Start recording, keeping the `top` slowest callbacks. With `json`, the
+    report is a single JSON line instead of text.
+    """
+    global recorder
+    recorder = LoopStats(top=top, json=json)
+    return recorder
+
+
+def disable() -> Optional[LoopStats]:
+    """
+    Stop recording and return what was recorded.
+    """
+    global recorder
+    stats, recorder = recorder, None
+    return stats
+
+
+def report(stream: Optional[streams.OutputStream] = None) -> None:
+    """
+    Write the summary of the active recorder to `stream`, stderr by default.
+    """
+    if recorder is None:
+        return
+    data = recorder.format().encode()
+    if stream is None:
+        stream = stderr.get_stderr()
+    for offset in range(0, len(data), 4096):
+        stream.blocking_write_and_flush(data[offset:offset + 4096])
+
+
+def _label(label: Any) -> str:
+    if isinstance(label, str):
+        return label
+    if hasattr(label, "func"):
+        return _label(label.func)
+    owner = getattr(label, "__self__", None)
+    if hasattr(owner, "get_coro"):
+        coro = owner.get_coro()
+        return f"{owner.get_name()} ({getattr(coro, '__qualname__', coro)})"
+    return getattr(label, "__qualname__", None) or repr(label)
+
+
+def _ms(ns: int) -> str:
+    if ns < 1_000_000:
+        return f"{ns / 1000:.1f} us"
+    return f"{ns / 1_000_000:.1f} ms"
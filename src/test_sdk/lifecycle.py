@@ -0,0 +1,151 @@
+"""
+Per-run phase timings for `RunHandler`.
+
+`RunHandler.run` goes through `setup`, `handle` and `teardown`, timing each
+with `monotonic_clock.now()`, and records them with the import time of
+`test_sdk` and the time from the end of that import to the start of `run`
+(the rest of module loading) in a `RunTiming`. Exporters added with
+`subscribe` receive every `RunTiming` before the shutdown pipeline runs, so
+whatever they write is flushed with the rest of the output.
+
+The import is timed with `time.monotonic_ns()`, which reads the same
+`wasi:clocks` monotonic clock. In a pre-initialized component (see `snapshot`)
+the import happened at build time; both times are then reported as 0.
+"""
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List
+
+from .wit.imports import monotonic_clock
+from . import instrument
+from .instrument import _ms
+
+
+_loaded_ns = 0
+_imported_ns = 0
+_preinitialized = False
+
+
+def mark_imported(loaded_ns: int) -> None:
+    """
+    Record that the `test_sdk` import started at `loaded_ns` and ends now
+    (both `time.monotonic_ns()`). Called by `test_sdk/__init__.py`.
+    """
+    global _loaded_ns, _imported_ns
+    _loaded_ns = loaded_ns
+    _imported_ns = time.monotonic_ns()
+
+
+def mark_preinitialized() -> None:
+    """
+    Record that the import is part of a build-time snapshot.
+    """
+    global _preinitialized
+    _preinitialized = True
+
+
+@dataclass
+class RunTiming:
+    import_ns: int
+    """Time spent importing `test_sdk`."""
+    startup_ns: int
+    """Time from the end of the `test_sdk` import to the start of `run`."""
+    phases_ns: Dict[str, int] = field(default_factory=dict)
+    """Time spent in each phase that ran: `preinit` (when it was not done at
+    build time), `setup`, `handle` and `teardown`."""
+    ok: bool = True
+    """Whether every phase completed without raising."""
+    preinitialized: bool = False
+    """Whether the run started from a pre-initialized snapshot."""
+
+    @classmethod
+    def start(cls) -> "RunTiming":
+        if _preinitialized:
+            return cls(0, 0, preinitialized=True)
+        return cls(_imported_ns - _loaded_ns, time.monotonic_ns() - _imported_ns)
+
+    @property
+    def run_ns(self) -> int:
+        """
+        Time spent in all phases.
+        """
+        return sum(self.phases_ns.values())
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Time the body of the `with` block as phase `name`.
+        """
+        start = monotonic_clock.now()
+        try:
+            yield
+        except BaseException:
+            self.ok = False
+            raise
+        finally:
+            self.phases_ns[name] = monotonic_clock.now() - start
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "import_ns": self.import_ns,
+            "startup_ns": self.startup_ns,
+            **{f"{name}_ns": ns for name, ns in self.phases_ns.items()},
+            "run_ns": self.run_ns,
+            "ok": self.ok,
+            "preinitialized": self.preinitialized,
+        }
+
+    def format(self) -> str:
+        parts = [] if self.preinitialized else [f"import {_ms(self.import_ns)}", f"startup {_ms(self.startup_ns)}"]
+        parts.extend(f"{name} {_ms(ns)}" for name, ns in self.phases_ns.items())
+        status = " (preinitialized)" if self.preinitialized else ""
+        if not self.ok:
+            status += " (failed)"
+        return f"test_sdk: run{status}: " + ", ".join(parts) + "\n"
+
+
+_exporters: List[Callable[[RunTiming], Any]] = []
+
+
+def subscribe(exporter: Callable[[RunTiming], Any]) -> None:
+    """
+    Call `exporter(timing)` after every run's `teardown`.
+    """
+    _exporters.append(exporter)
+
+
+def unsubscribe(exporter: Callable[[RunTiming], Any]) -> None:
+    """
+    Stop calling `exporter`. Removing one that was not added does nothing.
+    """
+    if exporter in _exporters:
+        _exporters.remove(exporter)
+
+
+def export(timing: RunTiming) -> None:
+    """
+    Hand `timing` to the instrumentation recorder, if enabled, and to every
+    exporter. An exporter that raises is reported on stderr and does not
+    fail the run.
+    """
+    recorder = instrument.recorder
+    if recorder is not None:
+        if not timing.preinitialized:
+            recorder.record_phase("import", timing.import_ns)
+            recorder.record_phase("startup", timing.startup_ns)
+        for name, ns in timing.phases_ns.items():
+            recorder.record_phase(name, ns)
+    for exporter in list(_exporters):
+        try:
+            exporter(timing)
+        except Exception as exc:
+            sys.stderr.write(f"test_sdk: timing exporter {exporter!r} failed: {exc!r}\n")
+
+
+def report(timing: RunTiming) -> None:
+    """
+    An exporter writing `timing` to `sys.stderr` as one line.
+    """
+    sys.stderr.write(timing.format())
@@ -0,0 +1,224 @@
+"""
+Structured logging to stderr that stays off the hot path.
+
+`Logger.log` only appends the message, its arguments and fields to a bounded
+ring buffer; formatting (`msg % args`, JSON encoding) happens when the ring is
+drained. The ring drains without blocking: when it is half full, whenever a
+scheduler is about to wait (a `PollSet` idle hook), and when `RunHandler.run`
+returns. Each drain hands stderr only as much as `check_write` permits.
+
+A stream error while draining from the idle hook does not propagate into the
+scheduler: it is counted in `errors`, kept in `last_error`, and the logger stops
+draining from the hook.
+
+When the ring is full, the `DROP` policy discards the oldest record and counts
+it in `dropped`; the `BLOCK` policy waits for stderr instead.
+"""
+import json as _json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from .wit.imports import stderr
+from .wit.imports import streams
+from .wit.types import Err
+from .pollset import add_idle_hook, remove_idle_hook
+from .subscription import Subscription
+
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+_LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+DROP = "drop"
+"""Discard the oldest record when the ring is full."""
+BLOCK = "block"
+"""Wait for stderr to accept data when the ring is full."""
+
+DEFAULT_CAPACITY = 1024
+
+# time, level, message, args, fields
+_Record = Tuple[float, int, str, tuple, Dict[str, Any]]
+
+
+class Logger:
+    """
+    A ring-buffered logger writing to `stream` (stderr by default), as text
+    lines or, with `json=True`, JSON lines.
+
+    The logger owns `stream`: `close()` flushes, drops the stream's pollable
+    and then the stream.
+    """
+
+    def __init__(self, name: str = "", stream: Optional[streams.OutputStream] = None, capacity: int = DEFAULT_CAPACITY, overflow: str = DROP, json: bool = False, level: int = INFO) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if overflow not in (DROP, BLOCK):
+            raise ValueError(f"unknown overflow policy {overflow!r}")
+        self.name = name
+        self.stream = stderr.get_stderr() if stream is None else stream
+        self.capacity = capacity
+        self.overflow = overflow
+        self.json = json
+        self.level = level
+        self.logged = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error: Optional[Err] = None
+        self._ring: Deque[_Record] = deque()
+        self._pending = bytearray()
+        self._subscription = Subscription(self.stream)
+        self._closed = False
+        _loggers[id(self)] = self
+        add_idle_hook(self._idle)
+
+    @property
+    def buffered(self) -> int:
+        """
+        Number of records not yet formatted and written.
+        """
+        return len(self._ring)
+
+    def log(self, level: int, msg: str, *args: Any, **fields: Any) -> None:
+        """
+        Queue a record. `msg % args` and `fields` are formatted when the
+        record is written, so arguments should not be mutated afterwards.
+        """
+        if level < self.level or self._closed:
+            return
+        ring = self._ring
+        if len(ring) >= self.capacity:
+            if self.overflow == BLOCK:
+                while len(ring) >= self.capacity:
+                    if not self.pump():
+                        self._subscription.block()
+            else:
+                ring.popleft()
+                self.dropped += 1
+        ring.append((time.time(), level, msg, args, fields))
+        self.logged += 1
+        if len(ring) * 2 >= self.capacity:
+            self.pump()
+
+    def debug(self, msg: str, *args: Any, **fields: Any) -> None:
+        self.log(DEBUG, msg, *args, **fields)
+
+    def info(self, msg: str, *args: Any, **fields: Any) -> None:
+        self.log(INFO, msg, *args, **fields)
+
+    def warning(self, msg: str, *args: Any, **fields: Any) -> None:
+        self.log(WARNING, msg, *args, **fields)
+
+    def error(self, msg: str, *args: Any, **fields: Any) -> None:
+        self.log(ERROR, msg, *args, **fields)
+
+    def pump(self) -> bool:
+        """
+        Format and write records while stderr grants permits, without
+        blocking. Returns whether everything has been written.
+        """
+        ring = self._ring
+        pending = self._pending
+        while pending or ring:
+            permit = self.stream.check_write()
+            if not permit:
+                return False
+            while ring and len(pending) < permit:
+                pending += self._format(ring.popleft())
+            count = min(permit, len(pending))
+            with memoryview(pending) as view:
+                chunk = bytes(view[:count])
+            self.stream.write(chunk)
+            del pending[:count]
+        return True
+
+    def flush(self) -> None:
+        """
+        Write every record, waiting for permits, and wait for stderr to
+        flush.
+        """
+        while not self.pump():
+            self._subscription.block()
+        self.stream.flush()
+        self._subscription.block()
+
+    def close(self) -> None:
+        """
+        Flush, then drop the stream's pollable and the stream.
+        """
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._closed = True
+            remove_idle_hook(self._idle)
+            _loggers.pop(id(self), None)
+            self._subscription.close()
+
+    def _idle(self) -> None:
+        # Runs inside `PollSet.wait`, where an error would stop the handler's
+        # scheduler.
+        try:
+            self.pump()
+        except Err as error:
+            self.errors += 1
+            self.last_error = error
+            remove_idle_hook(self._idle)
+
+    def _format(self, record: _Record) -> bytes:
+        timestamp, level, msg, args, fields = record
+        try:
+            message = msg % args if args else msg
+        except (TypeError, ValueError) as exc:
+            message = f"{msg!r} % {args!r} failed: {exc}"
+        level_name = _LEVEL_NAMES.get(level, str(level))
+        if self.json:
+            entry = {"ts": timestamp, "level": level_name, "msg": message}
+            if self.name:
+                entry["logger"] = self.name
+            entry.update(fields)
+            return _json.dumps(entry, default=str).encode() + b"\n"
+        when = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(timestamp))
+        line = f"{when}.{int(timestamp % 1 * 1000):03d}Z {level_name}"
+        if self.name:
+            line += f" {self.name}"
+        line += f" {message}"
+        for key, value in fields.items():
+            line += f" {key}={value!r}"
+        return line.encode("utf-8", "backslashreplace") + b"\n"
+
+
+# Open loggers are kept alive until closed so queued records are never lost to
+# garbage collection before `flush_all` runs.
+_loggers: Dict[int, Logger] = {}
+
+_default: Optional[Logger] = None
+
+
+def get_logger() -> Logger:
+    """
+    Return the shared text `Logger` over stderr, creating it on first use.
+    """
+    global _default
+    if _default is None or _default._closed:
+        _default = Logger()
+    return _default
+
+
+def flush_all() -> None:
+    """
+    Flush every open `Logger`. `RunHandler.run` calls this when the handler
+    returns or raises.
+    """
+    error = None
+    for logger in list(_loggers.values()):
+        try:
+            logger.flush()
+        except Exception as exc:
+            error = error or exc
+    if error is not None:
+        raise error
@@ -0,0 +1,309 @@
+"""
+An `asyncio` event loop driven by `wasi:io/poll`.
+
+Coroutines wait on WASI pollables (from `InputStream.subscribe`,
+`OutputStream.subscribe`, `FutureIncomingResponse.subscribe`,
+`TcpSocket.subscribe`, ...) with `wait_ready`, and the loop waits on all of
+them, kept in a `PollSet`, plus the single clock pollable of its `TimerWheel`
+in one `poll.poll` call per iteration.
+"""
+import asyncio
+import functools
+import math
+import sys
+import traceback
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from .wit.imports import poll
+from .wit.imports import monotonic_clock
+from .pollset import PollSet, Registration
+from .timers import Timer, TimerWheel
+from . import instrument
+
+
+class PollLoop(asyncio.AbstractEventLoop):
+    """
+    A single-threaded event loop whose only blocking point is `poll.poll`.
+
+    Network, subprocess, signal and executor APIs of `AbstractEventLoop` are
+    not available in a component and keep raising `NotImplementedError`.
+    """
+
+    def __init__(self, timer_resolution: int = 1_000_000) -> None:
+        self._ready: Deque[asyncio.Handle] = deque()
+        self._timers = TimerWheel(resolution=timer_resolution)
+        self._timer_entries: Dict[int, Timer] = {}
+        self._pollset = PollSet()
+        self._running = False
+        self._stopping = False
+        self._closed = False
+        self._debug = False
+        self._exception_handler: Optional[Callable[..., Any]] = None
+        self._task_factory: Optional[Callable[..., Any]] = None
+
+    # Running and stopping the event loop.
+
+    def run_forever(self) -> None:
+        if self._closed:
+            raise RuntimeError("Event loop is closed")
+        if self._running:
+            raise RuntimeError("This event loop is already running")
+        if asyncio._get_running_loop() is not None:
+            raise RuntimeError("Cannot run the event loop while another loop is running")
+        self._running = True
+        asyncio._set_running_loop(self)
+        try:
+            while not self._stopping:
+                self._run_once()
+        finally:
+            self._stopping = False
+            self._running = False
+            asyncio._set_running_loop(None)
+
+    def run_until_complete(self, future: Any) -> Any:
+        future = asyncio.ensure_future(future, loop=self)
+        future.add_done_callback(self._stop_when_done)
+        try:
+            self.run_forever()
+        finally:
+            future.remove_done_callback(self._stop_when_done)
+        if not future.done():
+            raise RuntimeError("Event loop stopped before Future completed.")
+        return future.result()
+
+    def _stop_when_done(self, future: asyncio.Future) -> None:
+        self.stop()
+
+    def stop(self) -> None:
+        self._stopping = True
+
+    def is_running(self) -> bool:
+        return self._running
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def close(self) -> None:
+        if self._running:
+            raise RuntimeError("Cannot close a running event loop")
+        self._closed = True
+        self._ready.clear()
+        self._timers.close()
+        self._timer_entries.clear()
+        self._pollset.clear()
+
+    async def shutdown_asyncgens(self) -> None:
+        pass
+
+    async def shutdown_default_executor(self, timeout: Optional[float] = None) -> None:
+        pass
+
+    # Scheduling.
+
+    def _run_once(self) -> None:
+        if not (self._ready or self._pollset or self._timers):
+            raise RuntimeError("Event loop has nothing left to wait on")
+        recorder = instrument.recorder
+        if recorder is not None:
+            recorder.begin_iteration()
+        try:
+            if self._pollset or (self._timers and not self._ready):
+                self._wait()
+            self._expire_timers()
+            # Only run what is ready now; callbacks scheduled by these handles
+            # wait for the next iteration so I/O is polled in between.
+            if recorder is None:
+                for _ in range(len(self._ready)):
+                    handle = self._ready.popleft()
+                    if not handle._cancelled:
+                        handle._run()
+            else:
+                for _ in range(len(self._ready)):
+                    handle = self._ready.popleft()
+                    if not handle._cancelled:
+                        start = monotonic_clock.now()
+                        handle._run()
+                        recorder.record_callback(monotonic_clock.now() - start, handle._callback)
+        finally:
+            if recorder is not None:
+                recorder.end_iteration()
+
+    def _wait(self) -> None:
+        if self._ready:
+            zero = monotonic_clock.subscribe_duration(0)
+            try:
+                self._pollset.wait(zero)
+            finally:
+                zero.__exit__(None, None, None)
+        else:
+            self._pollset.wait(self._timers.pollable())
+
+    def _expire_timers(self) -> None:
+        if self._timers:
+            self._timers.run_expired()
+
+    def _timer_fired(self, handle: asyncio.TimerHandle) -> None:
+        del self._timer_entries[id(handle)]
+        handle._scheduled = False
+        self._ready.append(handle)
+
+    def call_soon(self, callback: Callable[..., Any], *args: Any, context: Any = None) -> asyncio.Handle:
+        self._check_closed()
+        handle = asyncio.Handle(callback, args, self, context)
+        self._ready.append(handle)
+        return handle
+
+    def call_soon_threadsafe(self, callback: Callable[..., Any], *args: Any, context: Any = None) -> asyncio.Handle:
+        return self.call_soon(callback, *args, context=context)
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any, context: Any = None) -> asyncio.TimerHandle:
+        return self.call_at(self.time() + delay, callback, *args, context=context)
+
+    def call_at(self, when: float, callback: Callable[..., Any], *args: Any, context: Any = None) -> asyncio.TimerHandle:
+        self._check_closed()
+        handle = asyncio.TimerHandle(when, callback, args, self, context)
+        deadline = math.ceil(when * 1e9)
+        self._timer_entries[id(handle)] = self._timers.add(deadline, self._timer_fired, handle)
+        handle._scheduled = True
+        return handle
+
+    def _timer_handle_cancelled(self, handle: asyncio.TimerHandle) -> None:
+        timer = self._timer_entries.pop(id(handle), None)
+        if timer is not None:
+            timer.cancel()
+
+    def time(self) -> float:
+        return monotonic_clock.now() / 1e9
+
+    def _check_closed(self) -> None:
+        if self._closed:
+            raise RuntimeError("Event loop is closed")
+
+    # Pollables.
+
+    def add_pollable(self, pollable: poll.Pollable, future: asyncio.Future) -> None:
+        """
+        Resolve `future` with `None` once `pollable` is ready.
+
+        The loop does not take ownership of `pollable`; the caller drops it
+        once it is no longer needed.
+        """
+        self._check_closed()
+        registration = self._pollset.register(pollable, self._wake, future)
+        registration.args = (future, registration)
+        future.add_done_callback(functools.partial(self._discard_registration, registration))
+
+    def _wake(self, future: asyncio.Future, registration: Registration) -> None:
+        registration.cancel()
+        if not future.done():
+            future.set_result(None)
+
+    def _discard_registration(self, registration: Registration, future: asyncio.Future) -> None:
+        registration.cancel()
+
+    # Futures and tasks.
+
+    def create_future(self) -> asyncio.Future:
+        return asyncio.Future(loop=self)
+
+    def create_task(self, coro: Any, *, name: Optional[str] = None, context: Any = None) -> asyncio.Task:
+        self._check_closed()
+        if self._task_factory is None:
+            task = asyncio.Task(coro, loop=self, name=name, context=context)
+        else:
+            if context is None:
+                task = self._task_factory(self, coro)
+            else:
+                task = self._task_factory(self, coro, context=context)
+            if name is not None:
+                task.set_name(name)
+        return task
+
+    def set_task_factory(self, factory: Optional[Callable[..., Any]]) -> None:
+        self._task_factory = factory
+
+    def get_task_factory(self) -> Optional[Callable[..., Any]]:
+        return self._task_factory
+
+    # Error handlers.
+
+    def get_exception_handler(self) -> Optional[Callable[..., Any]]:
+        return self._exception_handler
+
+    def set_exception_handler(self, handler: Optional[Callable[..., Any]]) -> None:
+        self._exception_handler = handler
+
+    def default_exception_handler(self, context: dict) -> None:
+        message = context.get("message") or "Unhandled exception in event loop"
+        exception = context.get("exception")
+        lines = [message + "\n"]
+        for key in sorted(context):
+            if key not in ("message", "exception"):
+                lines.append(f"{key}: {context[key]!r}\n")
+        if exception is not None:
+            lines.extend(traceback.format_exception(exception))
+        sys.stderr.write("".join(lines))
+
+    def call_exception_handler(self, context: dict) -> None:
+        if self._exception_handler is None:
+            self.default_exception_handler(context)
+        else:
+            self._exception_handler(self, context)
+
+    # Debug flag management.
+
+    def get_debug(self) -> bool:
+        return self._debug
+
+    def set_debug(self, enabled: bool) -> None:
+        self._debug = enabled
+
+
+async def wait_ready(pollable: poll.Pollable) -> None:
+    """
+    Wait until `pollable` is ready without blocking other tasks.
+
+    Must be awaited on a running `PollLoop`.
+    """
+    if pollable.ready():
+        return
+    loop = asyncio.get_running_loop()
+    if not isinstance(loop, PollLoop):
+        raise RuntimeError("wait_ready() requires a running PollLoop")
+    future = loop.create_future()
+    loop.add_pollable(pollable, future)
+    await future
+
+
+def run(main: Any) -> Any:
+    """
+    Run the coroutine `main` on a new `PollLoop` and return its result,
+    like `asyncio.run`.
+    """
+    loop = PollLoop()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            _cancel_all_tasks(loop)
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+
+def _cancel_all_tasks(loop: PollLoop) -> None:
+    tasks = [task for task in asyncio.all_tasks(loop) if not task.done()]
+    if not tasks:
+        return
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            loop.call_exception_handler({
+                "message": "unhandled exception during test_sdk.loop.run() shutdown",
+                "exception": task.exception(),
+                "task": task,
+            })
@@ -0,0 +1,153 @@
+"""
+A persistent set of pollables for `poll.poll`.
+
+`poll.poll` answers with indices into the list it was given. `PollSet` keeps
+that list and the index-to-owner mapping up to date as pollables are
+registered and unregistered (removal swaps the last entry into the hole), so
+a wait costs O(ready) in Python instead of rebuilding both on every turn.
+
+Idle hooks added with `add_idle_hook` run before every `PollSet.wait`, that
+is, whenever a scheduler is about to block; they must not block themselves.
+"""
+from typing import Any, Callable, List, Optional
+
+from .wit.imports import poll
+from .wit.imports import monotonic_clock
+from . import instrument
+
+
+class Registration:
+    """
+    A pollable registered with a `PollSet`, returned by `PollSet.register`.
+    """
+
+    __slots__ = ("pollable", "callback", "args", "_index", "_pollset")
+
+    def __init__(self, pollset: "PollSet", pollable: poll.Pollable, callback: Callable[..., Any], args: tuple, index: int) -> None:
+        self.pollable = pollable
+        self.callback = callback
+        self.args = args
+        self._index = index
+        self._pollset: Optional["PollSet"] = pollset
+
+    @property
+    def active(self) -> bool:
+        """
+        Whether the registration is still part of its `PollSet`.
+        """
+        return self._pollset is not None
+
+    def cancel(self) -> None:
+        """
+        Unregister. Cancelling twice does nothing.
+        """
+        if self._pollset is not None:
+            self._pollset.unregister(self)
+
+
+class PollSet:
+    """
+    Stable registrations of pollables with callback dispatch.
+
+    The set does not own the registered pollables; callers drop them after
+    unregistering.
+    """
+
+    def __init__(self) -> None:
+        self._pollables: List[poll.Pollable] = []
+        self._registrations: List[Registration] = []
+
+    def __len__(self) -> int:
+        return len(self._pollables)
+
+    def register(self, pollable: poll.Pollable, callback: Callable[..., Any], *args: Any) -> Registration:
+        """
+        Call `callback(*args)` after every `wait` in which `pollable` is
+        ready, until the returned registration is cancelled.
+        """
+        registration = Registration(self, pollable, callback, args, len(self._pollables))
+        self._pollables.append(pollable)
+        self._registrations.append(registration)
+        return registration
+
+    def unregister(self, registration: Registration) -> None:
+        """
+        Remove `registration` in O(1) by moving the last entry into its slot.
+        """
+        if registration._pollset is not self:
+            raise ValueError("registration does not belong to this PollSet")
+        index = registration._index
+        last = self._registrations.pop()
+        pollable = self._pollables.pop()
+        if last is not registration:
+            self._registrations[index] = last
+            self._pollables[index] = pollable
+            last._index = index
+        registration._index = -1
+        registration._pollset = None
+
+    def clear(self) -> None:
+        """
+        Unregister everything.
+        """
+        for registration in self._registrations:
+            registration._index = -1
+            registration._pollset = None
+        self._registrations.clear()
+        self._pollables.clear()
+
+    def wait(self, extra: Optional[poll.Pollable] = None) -> int:
+        """
+        Block in one `poll.poll` call until at least one registered pollable,
+        or `extra`, is ready, then dispatch the callbacks of the ready
+        registrations. Returns the number of callbacks dispatched.
+
+        `extra` takes part in this wait only; it is typically a timer or
+        zero-timeout pollable whose readiness the caller checks itself.
+        """
+        if extra is None and not self._pollables:
+            return 0
+        # A hook may remove itself.
+        for hook in tuple(_idle_hooks):
+            hook()
+        pollables = self._pollables
+        registrations = self._registrations
+        count = len(pollables)
+        if extra is not None:
+            pollables.append(extra)
+        recorder = instrument.recorder
+        if recorder is not None:
+            start = monotonic_clock.now()
+        try:
+            ready = poll.poll(pollables)
+        finally:
+            if extra is not None:
+                pollables.pop()
+        if recorder is not None:
+            recorder.record_poll(monotonic_clock.now() - start, len(ready), len(pollables) + (extra is not None))
+        # Resolve indices before any callback can reorder the set.
+        woken = [registrations[index] for index in ready if index < count]
+        dispatched = 0
+        for registration in woken:
+            if registration._pollset is self:
+                registration.callback(*registration.args)
+                dispatched += 1
+        return dispatched
+
+
+_idle_hooks: List[Callable[[], Any]] = []
+
+
+def add_idle_hook(hook: Callable[[], Any]) -> None:
+    """
+    Call `hook()` before every `PollSet.wait`.
+    """
+    _idle_hooks.append(hook)
+
+
+def remove_idle_hook(hook: Callable[[], Any]) -> None:
+    """
+    Stop calling `hook`. Removing a hook that was not added does nothing.
+    """
+    if hook in _idle_hooks:
+        _idle_hooks.remove(hook)
@@ -0,0 +1,324 @@
+"""
+`io.RawIOBase` adapters for WASI streams and descriptors.
+
+The adapters let stdlib consumers (`gzip.GzipFile`, `csv`, `json.load`,
+`tarfile`, `zipfile`, ...) read and write WASI resources directly. Wrap them
+in `io.BufferedReader` / `io.BufferedWriter` (or use `open_input`,
+`open_output` and `open_descriptor`) for buffering.
+"""
+import errno
+import io
+import sys
+from typing import TYPE_CHECKING, Optional
+
+from .wit.imports import streams
+from .wit.types import Err
+from .subscription import Subscription
+from .writer import split_zeros
+
+if TYPE_CHECKING:
+    from .wit.imports import wasi_filesystem_types
+
+
+_ERRNO = {
+    "ACCESS": errno.EACCES,
+    "WOULD_BLOCK": errno.EAGAIN,
+    "ALREADY": errno.EALREADY,
+    "BAD_DESCRIPTOR": errno.EBADF,
+    "BUSY": errno.EBUSY,
+    "DEADLOCK": errno.EDEADLK,
+    "QUOTA": errno.EDQUOT,
+    "EXIST": errno.EEXIST,
+    "FILE_TOO_LARGE": errno.EFBIG,
+    "ILLEGAL_BYTE_SEQUENCE": errno.EILSEQ,
+    "IN_PROGRESS": errno.EINPROGRESS,
+    "INTERRUPTED": errno.EINTR,
+    "INVALID": errno.EINVAL,
+    "IO": errno.EIO,
+    "IS_DIRECTORY": errno.EISDIR,
+    "LOOP": errno.ELOOP,
+    "TOO_MANY_LINKS": errno.EMLINK,
+    "MESSAGE_SIZE": errno.EMSGSIZE,
+    "NAME_TOO_LONG": errno.ENAMETOOLONG,
+    "NO_DEVICE": errno.ENODEV,
+    "NO_ENTRY": errno.ENOENT,
+    "NO_LOCK": errno.ENOLCK,
+    "INSUFFICIENT_MEMORY": errno.ENOMEM,
+    "INSUFFICIENT_SPACE": errno.ENOSPC,
+    "NOT_DIRECTORY": errno.ENOTDIR,
+    "NOT_EMPTY": errno.ENOTEMPTY,
+    "NOT_RECOVERABLE": errno.ENOTRECOVERABLE,
+    "UNSUPPORTED": errno.ENOTSUP,
+    "NO_TTY": errno.ENOTTY,
+    "NO_SUCH_DEVICE": errno.ENXIO,
+    "OVERFLOW": errno.EOVERFLOW,
+    "NOT_PERMITTED": errno.EPERM,
+    "PIPE": errno.EPIPE,
+    "READ_ONLY": errno.EROFS,
+    "INVALID_SEEK": errno.ESPIPE,
+    "TEXT_FILE_BUSY": errno.ETXTBSY,
+    "CROSS_DEVICE": errno.EXDEV,
+}
+
+
+def os_error(error: Err) -> OSError:
+    """
+    Convert a `streams.StreamError` or `wasi_filesystem_types.ErrorCode`
+    raised as `Err` into the matching `OSError` subclass.
+    """
+    value = error.value
+    # Nothing can raise an `ErrorCode` before its module is loaded.
+    filesystem = sys.modules.get(f"{__package__}.wit.imports.wasi_filesystem_types")
+    if filesystem is not None and isinstance(value, filesystem.ErrorCode):
+        code = _ERRNO.get(value.name, errno.EIO)
+        return OSError(code, f"{value.name.lower().replace('_', ' ')}")
+    if isinstance(value, streams.StreamError_Closed):
+        return BrokenPipeError(errno.EPIPE, "stream closed")
+    if isinstance(value, streams.StreamError_LastOperationFailed):
+        return OSError(errno.EIO, value.value.to_debug_string())
+    return OSError(errno.EIO, repr(value))
+
+
+class InputStreamIO(io.RawIOBase):
+    """
+    A readable raw file over an `InputStream`. Reads block until at least one
+    byte is available and return 0 bytes at end of stream.
+    """
+
+    def __init__(self, stream: streams.InputStream, closefd: bool = True) -> None:
+        super().__init__()
+        self.stream = stream
+        self.closefd = closefd
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:  # type: ignore[override]
+        self._checkClosed()
+        with memoryview(b) as view, view.cast("B") as target:
+            if self._eof or not len(target):
+                return 0
+            try:
+                data = self.stream.blocking_read(len(target))
+            except Err as error:
+                if isinstance(error.value, streams.StreamError_Closed):
+                    self._eof = True
+                    return 0
+                raise os_error(error) from None
+            target[:len(data)] = data
+            return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                super().close()
+            finally:
+                if self.closefd:
+                    self.stream.__exit__(None, None, None)
+
+
+class OutputStreamIO(io.RawIOBase):
+    """
+    A writable raw file over an `OutputStream`. Each `write` hands the host
+    as much as the current `check_write` permit allows, waiting for a permit
+    when there is none; `flush` waits for the host to flush. With
+    `zero_run` positive, runs of at least that many zeros go through
+    `write_zeroes`, counted in `bytes_zeroed`.
+    """
+
+    def __init__(self, stream: streams.OutputStream, closefd: bool = True, zero_run: int = 0) -> None:
+        super().__init__()
+        self.stream = stream
+        self.closefd = closefd
+        self.zero_run = zero_run
+        self.bytes_zeroed = 0
+        self._subscription = Subscription(stream)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:  # type: ignore[override]
+        self._checkClosed()
+        with memoryview(b) as view, view.cast("B") as data:
+            if not len(data):
+                return 0
+            try:
+                permit = self.stream.check_write()
+                while not permit:
+                    self._subscription.block()
+                    permit = self.stream.check_write()
+                count = min(permit, len(data))
+                zeros = False
+                if self.zero_run:
+                    zeros, count = split_zeros(data, count, self.zero_run)
+                if zeros:
+                    self.stream.write_zeroes(count)
+                    self.bytes_zeroed += count
+                else:
+                    self.stream.write(bytes(data[:count]))
+            except Err as error:
+                raise os_error(error) from None
+            return count
+
+    def flush(self) -> None:
+        if self.closed:
+            return
+        try:
+            self.stream.blocking_flush()
+        except Err as error:
+            raise os_error(error) from None
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                super().close()
+            finally:
+                if self.closefd:
+                    self._subscription.close()
+                else:
+                    self._subscription.release()
+
+
+class DescriptorIO(io.RawIOBase):
+    """
+    A seekable raw file over a `Descriptor`, using positional `read` and
+    `write`. Readability and writability follow the descriptor's flags.
+    """
+
+    def __init__(self, descriptor: "wasi_filesystem_types.Descriptor", closefd: bool = True) -> None:
+        from .wit.imports import wasi_filesystem_types
+
+        super().__init__()
+        self.descriptor = descriptor
+        self.closefd = closefd
+        self._position = 0
+        try:
+            flags = descriptor.get_flags()
+        except Err as error:
+            raise os_error(error) from None
+        self._readable = bool(flags & wasi_filesystem_types.DescriptorFlags.READ)
+        self._writable = bool(flags & wasi_filesystem_types.DescriptorFlags.WRITE)
+
+    def readable(self) -> bool:
+        return self._readable
+
+    def writable(self) -> bool:
+        return self._writable
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        self._checkClosed()
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._checkClosed()
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._size() + offset
+        else:
+            raise ValueError(f"invalid whence ({whence!r})")
+        if position < 0:
+            raise OSError(errno.EINVAL, "negative seek position")
+        self._position = position
+        return position
+
+    def readinto(self, b) -> int:  # type: ignore[override]
+        self._checkClosed()
+        self._checkReadable()
+        with memoryview(b) as view, view.cast("B") as target:
+            if not len(target):
+                return 0
+            try:
+                data, _ = self.descriptor.read(len(target), self._position)
+            except Err as error:
+                raise os_error(error) from None
+            target[:len(data)] = data
+            self._position += len(data)
+            return len(data)
+
+    def write(self, b) -> int:  # type: ignore[override]
+        self._checkClosed()
+        self._checkWritable()
+        with memoryview(b) as view, view.cast("B") as data:
+            if not len(data):
+                return 0
+            try:
+                count = self.descriptor.write(bytes(data), self._position)
+            except Err as error:
+                raise os_error(error) from None
+            self._position += count
+            return count
+
+    def truncate(self, size: Optional[int] = None) -> int:
+        self._checkClosed()
+        self._checkWritable()
+        if size is None:
+            size = self._position
+        try:
+            self.descriptor.set_size(size)
+        except Err as error:
+            raise os_error(error) from None
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                super().close()
+            finally:
+                if self.closefd:
+                    self.descriptor.__exit__(None, None, None)
+
+    def _size(self) -> int:
+        try:
+            return self.descriptor.stat().size
+        except Err as error:
+            raise os_error(error) from None
+
+
+class BufferedOutput(io.BufferedWriter):
+    """
+    An `io.BufferedWriter` whose `flush` also flushes the raw file.
+    `io.BufferedWriter.flush` only writes out its own buffer and never calls
+    `raw.flush()`, so over an `OutputStreamIO` it would return without
+    waiting for the host to flush.
+    """
+
+    def flush(self) -> None:
+        super().flush()
+        self.raw.flush()
+
+
+def open_input(stream: streams.InputStream, buffer_size: int = io.DEFAULT_BUFFER_SIZE) -> io.BufferedReader:
+    """
+    Return a buffered binary file reading from `stream`.
+    """
+    return io.BufferedReader(InputStreamIO(stream), buffer_size)
+
+
+def open_output(stream: streams.OutputStream, buffer_size: int = io.DEFAULT_BUFFER_SIZE, zero_run: int = 0) -> io.BufferedWriter:
+    """
+    Return a buffered binary file writing to `stream`. Its `flush` waits for
+    the host to flush the stream.
+    """
+    return BufferedOutput(OutputStreamIO(stream, zero_run=zero_run), buffer_size)
+
+
+def open_descriptor(descriptor: "wasi_filesystem_types.Descriptor", buffer_size: int = io.DEFAULT_BUFFER_SIZE) -> io.BufferedIOBase:
+    """
+    Return a buffered binary file over `descriptor`: a reader, a writer or
+    a random-access file, depending on the descriptor's flags. Writes go
+    straight to the descriptor, so `flush` has nothing to wait for once its
+    buffer is written.
+    """
+    raw = DescriptorIO(descriptor)
+    if raw.readable() and raw.writable():
+        return io.BufferedRandom(raw, buffer_size)
+    if raw.writable():
+        return BufferedOutput(raw, buffer_size)
+    return io.BufferedReader(raw, buffer_size)
@@ -0,0 +1,280 @@
+"""
+A buffered reader over `streams.InputStream`.
+
+`InputStream.read(len)` may return anywhere from 0 to `len` bytes. The reader
+asks the host for as much as its buffer can hold, keeps the bytes in one
+reusable `bytearray`, and waits on the stream's `subscribe()` pollable when a
+read would block, so line and record parsing cost neither a host call nor a
+copy per fragment. Under a `PollLoop`, `async for` yields chunks as they
+arrive without blocking other tasks.
+"""
+from typing import Iterator, Optional
+
+from .wit.imports import streams
+from .wit.types import Err
+from .subscription import Subscription
+
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+class IncompleteRead(EOFError):
+    """
+    The stream ended before `read_exactly` or `readuntil` could complete.
+    """
+
+    def __init__(self, partial: bytes, expected: Optional[int]) -> None:
+        what = "delimiter" if expected is None else f"{expected} bytes"
+        super().__init__(f"stream closed after {len(partial)} bytes, before {what}")
+        self.partial = partial
+        self.expected = expected
+
+
+class BufferedReader:
+    """
+    Buffered reads from an `InputStream`.
+
+    The reader owns `stream`: `close()` drops the stream's pollable and then
+    the stream. Methods block (through the pollable) until they can return;
+    `read` and `readinto` return `b""` / `0` only at end of stream.
+    """
+
+    def __init__(self, stream: streams.InputStream, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        if buffer_size <= 0:
+            raise ValueError("buffer_size must be positive")
+        self.stream = stream
+        self._subscription = Subscription(stream)
+        self._buf = bytearray(buffer_size)
+        self._start = 0
+        self._end = 0
+        self._eof = False
+
+    @property
+    def at_eof(self) -> bool:
+        """
+        Whether the stream is closed and the buffer is drained.
+        """
+        return self._eof and self._start == self._end
+
+    @property
+    def buffered(self) -> int:
+        """
+        Number of bytes available without another host call.
+        """
+        return self._end - self._start
+
+    def read(self, n: int = -1) -> bytes:
+        """
+        Return up to `n` bytes, or everything until end of stream when `n` is
+        negative. Waits only when nothing is buffered.
+        """
+        if n < 0:
+            while not self._eof:
+                if self._end == len(self._buf):
+                    self._reserve(len(self._buf))
+                self._fill()
+            return self._take(self._end - self._start)
+        if self._start == self._end and not self._eof:
+            self._fill()
+        return self._take(min(n, self._end - self._start))
+
+    def readinto(self, b: memoryview) -> int:
+        """
+        Read up to `len(b)` bytes into `b` and return how many were read.
+        Requests at least as large as the buffer bypass it when it is empty.
+        """
+        with memoryview(b) as view, view.cast("B") as target:
+            wanted = len(target)
+            if not wanted:
+                return 0
+            if self._start == self._end:
+                if self._eof:
+                    return 0
+                if wanted >= len(self._buf):
+                    return self._read_direct(target)
+                self._fill()
+            count = min(wanted, self._end - self._start)
+            target[:count] = self._buf[self._start:self._start + count]
+            self._consume(count)
+            return count
+
+    def peek(self, n: int = 1) -> bytes:
+        """
+        Return up to `n` upcoming bytes without consuming them, waiting
+        until `n` are buffered or the stream ends.
+        """
+        self._ensure(n)
+        return bytes(self._buf[self._start:self._start + min(n, self._end - self._start)])
+
+    def read_exactly(self, n: int) -> bytes:
+        """
+        Return exactly `n` bytes, or raise `IncompleteRead` if the stream ends
+        first (the partial data is consumed).
+        """
+        if n < 0:
+            raise ValueError("n must be non-negative")
+        self._ensure(n)
+        if self._end - self._start < n:
+            partial = self._take(self._end - self._start)
+            raise IncompleteRead(partial, n)
+        return self._take(n)
+
+    def readuntil(self, delim: bytes = b"\n", limit: int = -1) -> bytes:
+        """
+        Return the data up to and including the next `delim`. Raises
+        `IncompleteRead` if the stream ends first, and `ValueError` if `limit`
+        (when non-negative) bytes pass without a delimiter.
+        """
+        if not delim:
+            raise ValueError("delim must not be empty")
+        end = self._find(delim, limit)
+        if end < 0:
+            if limit >= 0 and self._end - self._start >= limit:
+                raise ValueError(f"no delimiter within {limit} bytes")
+            partial = self._take(self._end - self._start)
+            raise IncompleteRead(partial, None)
+        return self._take(end - self._start)
+
+    def readline(self, limit: int = -1) -> bytes:
+        """
+        Return the next line including its `b"\\n"`, at most `limit` bytes
+        when `limit` is non-negative, and `b""` at end of stream.
+        """
+        end = self._find(b"\n", limit)
+        if end < 0:
+            available = self._end - self._start
+            return self._take(available if limit < 0 else min(limit, available))
+        return self._take(end - self._start)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self
+
+    def __next__(self) -> bytes:
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+    def __aiter__(self) -> "BufferedReader":
+        return self
+
+    async def __anext__(self) -> bytes:
+        """
+        Return everything buffered as one chunk, waiting for data on the
+        running `PollLoop` instead of blocking it.
+        """
+        from .loop import wait_ready
+        while self._start == self._end:
+            if self._eof:
+                raise StopAsyncIteration
+            if not self._fill_nowait() and not self._eof:
+                await wait_ready(self._subscription.pollable)
+        return self._take(self._end - self._start)
+
+    def close(self) -> None:
+        """
+        Drop the stream's pollable, then the stream.
+        """
+        self._subscription.close()
+
+    def __enter__(self) -> "BufferedReader":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "BufferedReader":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _find(self, delim: bytes, limit: int) -> int:
+        # Returns the buffer offset just past the delimiter, or -1 at end of
+        # stream or once `limit` bytes were scanned. Bytes already searched
+        # are never searched again.
+        scanned = self._start
+        while True:
+            stop = self._end if limit < 0 else min(self._end, self._start + limit)
+            index = self._buf.find(delim, scanned, stop)
+            if index >= 0:
+                return index + len(delim)
+            if self._eof or (limit >= 0 and self._end - self._start >= limit):
+                return -1
+            scanned = max(self._start, self._end - len(delim) + 1) - self._start
+            if self._end == len(self._buf):
+                self._reserve(len(self._buf))
+            self._fill()
+            scanned += self._start
+
+    def _ensure(self, n: int) -> None:
+        available = self._end - self._start
+        if available >= n:
+            return
+        self._reserve(n - available)
+        while self._end - self._start < n and not self._eof:
+            self._fill()
+
+    def _reserve(self, n: int) -> None:
+        # Make room for `n` more bytes after the buffered data, compacting
+        # first and growing only when that is not enough.
+        available = self._end - self._start
+        if self._end + n <= len(self._buf) and self._end < len(self._buf):
+            return
+        if available + n > len(self._buf):
+            self._buf.extend(bytes(available + n - len(self._buf)))
+        if self._start:
+            self._buf[:available] = self._buf[self._start:self._end]
+            self._start = 0
+            self._end = available
+
+    def _fill(self) -> int:
+        while True:
+            count = self._fill_nowait()
+            if count or self._eof:
+                return count
+            self._subscription.block()
+
+    def _fill_nowait(self) -> int:
+        # One non-blocking host read into the free tail of the buffer.
+        # Returns the number of bytes added; 0 means it would block or the
+        # stream ended.
+        if self._end == len(self._buf):
+            if self._start == 0:
+                return 0
+            self._reserve(1)
+        try:
+            data = self.stream.read(len(self._buf) - self._end)
+        except Err as error:
+            if isinstance(error.value, streams.StreamError_Closed):
+                self._eof = True
+                return 0
+            raise
+        count = len(data)
+        self._buf[self._end:self._end + count] = data
+        self._end += count
+        return count
+
+    def _read_direct(self, target: memoryview) -> int:
+        while True:
+            try:
+                data = self.stream.read(len(target))
+            except Err as error:
+                if isinstance(error.value, streams.StreamError_Closed):
+                    self._eof = True
+                    return 0
+                raise
+            if data:
+                target[:len(data)] = data
+                return len(data)
+            self._subscription.block()
+
+    def _take(self, n: int) -> bytes:
+        data = bytes(self._buf[self._start:self._start + n])
+        self._consume(n)
+        return data
+
+    def _consume(self, n: int) -> None:
+        self._start += n
+        if self._start == self._end:
+            self._start = self._end = 0
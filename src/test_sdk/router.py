@@ -0,0 +1,122 @@
+"""
+Subcommand dispatch with on-demand imports.
+
+A `Router` maps subcommand names to dotted paths (`"tool.commands.sync"` or
+`"tool.commands.sync:run"`) and imports only the module of the subcommand
+being run, so the cost of a cold start follows the command instead of the
+whole tool:
+
+    router = Router("tool")
+    router.add("sync", "tool.commands.sync", help="sync the mirror")
+    router.add("gc", "tool.commands.gc:collect")
+
+    class Handler(RunHandler):
+        def handle(self):
+            return router.dispatch()
+
+The handler is called with the remaining arguments and its result is
+returned, so a coroutine or generator handler runs like any other
+`RunHandler.handle` result.
+"""
+import importlib
+import sys
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from .wit.imports import environment
+
+
+Handler = Callable[[List[str]], Any]
+
+_arguments: Optional[List[str]] = None
+
+
+def arguments() -> List[str]:
+    """
+    Return `environment.get_arguments()`, asking the host only once.
+    """
+    global _arguments
+    if _arguments is None:
+        _arguments = environment.get_arguments()
+    return _arguments
+
+
+class _Command:
+    __slots__ = ("name", "target", "help", "handler")
+
+    def __init__(self, name: str, target: Union[str, Handler], help: str) -> None:
+        self.name = name
+        self.target = target
+        self.help = help
+        self.handler: Optional[Handler] = None if isinstance(target, str) else target
+
+    def resolve(self) -> Handler:
+        if self.handler is None:
+            assert isinstance(self.target, str)
+            module_name, _, attribute = self.target.partition(":")
+            module = importlib.import_module(module_name)
+            self.handler = getattr(module, attribute or "main")
+        return self.handler
+
+
+class Router:
+    """
+    Subcommands registered by name, imported when dispatched.
+    """
+
+    def __init__(self, prog: Optional[str] = None) -> None:
+        self.prog = prog
+        self._commands: Dict[str, _Command] = {}
+
+    def add(self, name: str, target: Union[str, Handler], help: str = "", aliases: Sequence[str] = ()) -> None:
+        """
+        Register `target` as subcommand `name`. A string target is a dotted
+        module path, optionally followed by `:attribute` (default `main`),
+        resolved on first dispatch; a callable is used as is.
+        """
+        keys = (name, *aliases)
+        for key in keys:
+            if key in self._commands or keys.count(key) > 1:
+                raise ValueError(f"subcommand {key!r} already registered")
+        command = _Command(name, target, help)
+        for key in keys:
+            self._commands[key] = command
+
+    def command(self, name: str, help: str = "", aliases: Sequence[str] = ()) -> Callable[[Handler], Handler]:
+        """
+        Decorator form of `add` for handlers defined inline.
+        """
+        def register(handler: Handler) -> Handler:
+            self.add(name, handler, help, aliases)
+            return handler
+        return register
+
+    def usage(self) -> str:
+        prog = self.prog or (arguments()[0] if arguments() else "command")
+        lines = [f"usage: {prog} <command> [args...]", "", "commands:"]
+        seen = set()
+        for command in self._commands.values():
+            if command.name in seen:
+                continue
+            seen.add(command.name)
+            lines.append(f"  {command.name:<16} {command.help}".rstrip())
+        return "\n".join(lines) + "\n"
+
+    def dispatch(self, argv: Optional[Sequence[str]] = None) -> Any:
+        """
+        Run the subcommand named by the first argument of `argv` (by default
+        the program's arguments without the program name) with the rest, and
+        return its result.
+
+        With no subcommand or `-h`/`--help`, prints the usage to stdout and
+        returns `None`; an unknown subcommand prints it to stderr and raises
+        `SystemExit(2)`.
+        """
+        args = list(arguments()[1:] if argv is None else argv)
+        if not args or args[0] in ("-h", "--help"):
+            sys.stdout.write(self.usage())
+            return None
+        command = self._commands.get(args[0])
+        if command is None:
+            sys.stderr.write(f"unknown command {args[0]!r}\n\n{self.usage()}")
+            raise SystemExit(2)
+        return command.resolve()(args[1:])
@@ -0,0 +1,237 @@
+"""
+The ordered shutdown pipeline `RunHandler.run` goes through before
+`exit.exit`.
+
+The phases run in order, each timed with `monotonic_clock` and each running
+even if an earlier one failed:
+
+1. `FLUSH`: flush every `Logger`, then `sys.stdout`/`sys.stderr`, then
+   every open `BufferedWriter`. Loggers go first: their records were queued
+   before anything printed while the handler was failing.
+2. `BODIES`: flush the streams of tracked `OutgoingBody`s, drop them, and
+   finish the bodies with `OutgoingBody.finish`.
+3. `RESPONSES`: wait for tracked `FutureIncomingResponse`s until they are
+   all ready or `response_timeout` has passed, then drop them.
+4. `RESOURCES`: drop cached pollables, then tracked resources, most recently
+   tracked first, so children go before their parents.
+
+Hooks added with `add_hook` run at the end of their phase. The timings are
+kept in `timings` and, when instrumentation is enabled, included in its
+report.
+"""
+import sys
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .wit.imports import exit as wasi_exit
+from .wit.imports import monotonic_clock
+from .wit.imports import streams
+from .wit.types import Err, Ok
+from .pollset import PollSet, Registration
+from .writer import BufferedWriter
+from . import instrument
+from . import subscription
+
+if TYPE_CHECKING:
+    # Loaded when a body is finished, not by every handler that exits.
+    from .wit.imports import wasi_http_types
+
+
+FLUSH = "flush"
+BODIES = "bodies"
+RESPONSES = "responses"
+RESOURCES = "resources"
+PHASES = (FLUSH, BODIES, RESPONSES, RESOURCES)
+
+response_timeout = 5_000_000_000
+"""How long `RESPONSES` waits for outstanding responses, in nanoseconds."""
+
+
+@dataclass
+class PhaseTiming:
+    name: str
+    elapsed_ns: int
+    error: Optional[BaseException] = None
+    """The first error raised during the phase, if any."""
+
+
+timings: List[PhaseTiming] = []
+"""The phases of the last `run`."""
+
+_hooks: Dict[str, List[Callable[[], Any]]] = {phase: [] for phase in PHASES}
+_bodies: List[Tuple["wasi_http_types.OutgoingBody", Any, Optional["wasi_http_types.Fields"]]] = []
+_responses: List["wasi_http_types.FutureIncomingResponse"] = []
+_resources: List[Any] = []
+
+
+def add_hook(phase: str, hook: Callable[[], Any]) -> None:
+    """
+    Call `hook()` at the end of `phase`.
+    """
+    _hooks[phase].append(hook)
+
+
+def track_body(body: "wasi_http_types.OutgoingBody", stream: Union[streams.OutputStream, BufferedWriter, None] = None, trailers: Optional["wasi_http_types.Fields"] = None) -> None:
+    """
+    Finish `body` with `trailers` at shutdown unless it is untracked first.
+    `stream` is the body's `write()` stream, or a `BufferedWriter` over it;
+    it is flushed and dropped before the body is finished.
+    """
+    _bodies.append((body, stream, trailers))
+
+
+def track_response(future: "wasi_http_types.FutureIncomingResponse") -> None:
+    """
+    Wait for `future` at shutdown, up to `response_timeout`, then drop it.
+    """
+    _responses.append(future)
+
+
+def track_resource(resource: Any) -> None:
+    """
+    Drop `resource` at shutdown. Track a parent before its children.
+    """
+    _resources.append(resource)
+
+
+def untrack(obj: Any) -> None:
+    """
+    Stop tracking a body, response or resource the caller has released.
+    """
+    _bodies[:] = [entry for entry in _bodies if entry[0] is not obj]
+    _responses[:] = [future for future in _responses if future is not obj]
+    _resources[:] = [resource for resource in _resources if resource is not obj]
+
+
+def run(ok: bool = True, call_exit: bool = True) -> List[PhaseTiming]:
+    """
+    Run every phase, then call `exit.exit` with `Ok` if `ok` and no phase
+    failed, and `Err` otherwise. With `call_exit=False`, return the timings
+    instead of exiting.
+    """
+    timings.clear()
+    for name, step in ((FLUSH, _flush), (BODIES, _finish_bodies), (RESPONSES, _wait_responses), (RESOURCES, _drop_resources)):
+        start = monotonic_clock.now()
+        errors = _Errors()
+        errors.call(step)
+        for hook in _hooks[name]:
+            errors.call(hook)
+        timing = PhaseTiming(name, monotonic_clock.now() - start, errors.first)
+        timings.append(timing)
+        if instrument.recorder is not None:
+            instrument.recorder.record_phase(f"shutdown.{name}", timing.elapsed_ns)
+        if timing.error is not None:
+            ok = False
+            _report_error(timing)
+    if instrument.recorder is not None:
+        instrument.report()
+    if call_exit:
+        wasi_exit.exit(Ok(None) if ok else Err(None))
+    return list(timings)
+
+
+class _Errors:
+    # Runs steps, keeping the first error so later steps still run.
+
+    def __init__(self) -> None:
+        self.first: Optional[BaseException] = None
+
+    def call(self, step: Callable[[], Any]) -> None:
+        try:
+            step()
+        except Exception as exc:
+            if self.first is None:
+                self.first = exc
+
+
+def flush_logs() -> None:
+    """
+    Flush every open `Logger`, if any was ever created.
+    """
+    module = sys.modules.get(f"{__package__}.log")
+    if module is not None:
+        module.flush_all()
+
+
+def _flush() -> None:
+    errors = _Errors()
+    errors.call(flush_logs)
+    # Nothing can be buffered in a module that was never imported.
+    for name in ("stdio", "writer"):
+        module = sys.modules.get(f"{__package__}.{name}")
+        if module is not None:
+            errors.call(module.restore if name == "stdio" else module.flush_all)
+    if errors.first is not None:
+        raise errors.first
+
+
+def _finish_bodies() -> None:
+    errors = _Errors()
+    bodies = list(_bodies)
+    _bodies.clear()
+    for body, stream, trailers in bodies:
+        errors.call(lambda: _finish_body(body, stream, trailers))
+    if errors.first is not None:
+        raise errors.first
+
+
+def _finish_body(body: "wasi_http_types.OutgoingBody", stream: Any, trailers: Optional["wasi_http_types.Fields"]) -> None:
+    from .wit.imports import wasi_http_types
+
+    try:
+        if isinstance(stream, BufferedWriter):
+            # Flushes, then drops the pollable and the stream.
+            stream.close()
+        elif stream is not None:
+            try:
+                stream.blocking_flush()
+            finally:
+                subscription.close(stream)
+    except BaseException:
+        body.__exit__(None, None, None)
+        raise
+    wasi_http_types.OutgoingBody.finish(body, trailers)
+
+
+def _wait_responses() -> None:
+    futures = list(_responses)
+    _responses.clear()
+    if not futures:
+        return
+    subscriptions = [subscription.Subscription(future) for future in futures]
+    try:
+        pending = PollSet()
+        for entry in subscriptions:
+            registration = pending.register(entry.pollable, _done)
+            registration.args = (registration,)
+        timer = monotonic_clock.subscribe_duration(response_timeout)
+        try:
+            while pending and not timer.ready():
+                pending.wait(timer)
+        finally:
+            timer.__exit__(None, None, None)
+    finally:
+        for entry in subscriptions:
+            entry.close()
+
+
+def _done(registration: Registration) -> None:
+    registration.cancel()
+
+
+def _drop_resources() -> None:
+    errors = _Errors()
+    subscription.release_all()
+    while _resources:
+        resource = _resources.pop()
+        errors.call(lambda: resource.__exit__(None, None, None))
+    if errors.first is not None:
+        raise errors.first
+
+
+def _report_error(timing: PhaseTiming) -> None:
+    try:
+        sys.stderr.write(f"test_sdk: shutdown phase {timing.name!r} failed: {timing.error!r}\n")
+        sys.stderr.flush()
+    except Exception:
+        pass
@@ -0,0 +1,83 @@
+"""
+Build-time pre-initialization of `RunHandler` subclasses.
+
+componentize-py imports the application module while building the
+component and snapshots the interpreter afterwards, so everything done at
+import time is paid once at build time instead of on every cold start.
+`preinitialize` is what the entry module generated by `python -m
+test_sdk.build` calls while the snapshot is being taken: it imports the
+handler's module and any extra modules, then calls the handler's
+`RunHandler.preinit`. A handler that was not pre-initialized has `preinit`
+called at the start of its first `run` instead.
+
+Nothing here may call the host: resources created before the snapshot do
+not exist when it is restored. Header lists are prepared with
+`header_list` and turned into `Fields` at run time.
+"""
+import importlib
+import re
+from typing import Iterable, List, Mapping, Sequence, Set, Tuple, Union
+
+from . import lifecycle
+
+
+_done: Set[type] = set()
+
+_TOKEN = re.compile(r"[!#$%&'*+\-.^_`|~0-9a-z]+")
+
+
+def load(target: str) -> type:
+    """
+    Import `"module:attribute"` and return the attribute.
+    """
+    module_name, _, attribute = target.partition(":")
+    if not attribute:
+        raise ValueError(f"expected 'module:attribute', got {target!r}")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def is_preinitialized(cls: type) -> bool:
+    return cls in _done
+
+
+def ensure(cls: type) -> None:
+    """
+    Call `cls.preinit()` unless it has already completed.
+    """
+    if cls not in _done:
+        cls.preinit()
+        _done.add(cls)
+
+
+def preinitialize(target: str, modules: Sequence[str] = ()) -> type:
+    """
+    Import `modules`, load the handler class named by `target`
+    (`"module:Class"`) and pre-initialize it. Returns the class.
+    """
+    for name in modules:
+        importlib.import_module(name)
+    cls = load(target)
+    ensure(cls)
+    # Load times recorded now are build-time clock readings.
+    lifecycle.mark_preinitialized()
+    return cls
+
+
+def header_list(headers: Union[Mapping[str, Union[str, bytes]], Iterable[Tuple[str, Union[str, bytes]]]]) -> List[Tuple[str, bytes]]:
+    """
+    Validate and encode `headers` into the entries `Fields.from_list`
+    takes: names lowercased, values as bytes. Build constant header sets
+    once, in `preinit`, and pass the list to `Fields.from_list` per request.
+    """
+    items = headers.items() if isinstance(headers, Mapping) else headers
+    entries = []
+    for name, value in items:
+        name = name.lower()
+        if not _TOKEN.fullmatch(name):
+            raise ValueError(f"invalid header name: {name!r}")
+        if isinstance(value, str):
+            value = value.encode()
+        if b"\r" in value or b"\n" in value or b"\0" in value:
+            raise ValueError(f"invalid value for header {name!r}")
+        entries.append((name, value))
+    return entries
@@ -0,0 +1,178 @@
+"""
+Stream-to-stream copies that keep the bytes out of Python.
+
+`OutputStream.splice` moves data from an `InputStream` to an `OutputStream`
+inside the host. `copy_stream` uses it with a chunk size that adapts to the
+permits the destination grants, and `copy_streams` overlaps several copies
+(say, a file's `read_via_stream` into an `OutgoingBody.write()` stream while
+an `IncomingBody.stream()` goes to stdout) through one `poll.poll` per turn.
+When the host does not implement `splice`, the copy falls back to `read` and
+`write`.
+"""
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from .wit.imports import poll
+from .wit.imports import streams
+from .wit.imports import monotonic_clock
+from .wit.types import Err
+from .pollset import PollSet, Registration
+from .subscription import Subscription
+
+
+MIN_CHUNK = 4 * 1024
+MAX_CHUNK = 1024 * 1024
+
+
+@dataclass
+class CopyResult:
+    transferred: int
+    """Bytes moved from the source to the destination."""
+    elapsed_ns: int
+    """Time from the start of the copy until the destination was flushed."""
+    spliced: bool
+    """Whether the host moved the bytes with `splice`."""
+
+
+class _Copy:
+    # A non-blocking copy state machine. `step` does all the work possible
+    # without blocking and returns the pollable to wait on next, or `None`
+    # once the copy is complete.
+
+    def __init__(self, src: streams.InputStream, dst: streams.OutputStream, limit: Optional[int], chunk: int, max_chunk: int, flush: bool, splice: bool) -> None:
+        self.src = src
+        self.dst = dst
+        self.remaining = limit
+        self.chunk = chunk
+        self.min_chunk = min(chunk, MIN_CHUNK)
+        self.max_chunk = max(chunk, max_chunk)
+        self.flush = flush
+        self.splice = splice
+        self.transferred = 0
+        self.started = monotonic_clock.now()
+        self.finished: Optional[int] = None
+        self.flushing = False
+        self.registration: Optional[Registration] = None
+        self._src = Subscription(src)
+        self._dst = Subscription(dst)
+
+    def result(self) -> CopyResult:
+        assert self.finished is not None
+        return CopyResult(self.transferred, self.finished - self.started, self.splice)
+
+    def release(self) -> None:
+        self._src.release()
+        self._dst.release()
+
+    def step(self) -> Optional[poll.Pollable]:
+        if self.flushing:
+            # Surfaces any error raised while the host was flushing.
+            self.dst.check_write()
+            return self._finish()
+        while self.remaining is None or self.remaining > 0:
+            wanted = self.chunk if self.remaining is None else min(self.chunk, self.remaining)
+            try:
+                moved = self._splice(wanted) if self.splice else self._read_write(wanted)
+            except Err as error:
+                if not isinstance(error.value, streams.StreamError_Closed) or not self._source_closed():
+                    raise
+                break
+            if moved is None:
+                return self._dst.pollable
+            if moved == 0:
+                return self._src.pollable
+            self.transferred += moved
+            if self.remaining is not None:
+                self.remaining -= moved
+            if moved == wanted and self.chunk < self.max_chunk:
+                self.chunk = min(self.chunk * 2, self.max_chunk)
+        if self.flush:
+            self.dst.flush()
+            self.flushing = True
+            return self._dst.pollable
+        return self._finish()
+
+    def _splice(self, wanted: int) -> Optional[int]:
+        # Returns the bytes moved, 0 when the source has nothing ready, or
+        # `None` when the destination grants no permit.
+        try:
+            moved = self.dst.splice(self.src, wanted)
+        except NotImplementedError:
+            self.splice = False
+            return self._read_write(wanted)
+        if moved:
+            return moved
+        permit = self.dst.check_write()
+        if not permit:
+            return None
+        self.chunk = max(self.min_chunk, min(permit, self.max_chunk))
+        return 0
+
+    def _read_write(self, wanted: int) -> Optional[int]:
+        permit = self.dst.check_write()
+        if not permit:
+            return None
+        if permit < wanted:
+            self.chunk = max(self.min_chunk, permit)
+        data = self.src.read(min(permit, wanted))
+        if data:
+            self.dst.write(data)
+        return len(data)
+
+    def _source_closed(self) -> bool:
+        # `read(0)` fails with `closed` only when the source is at its end;
+        # otherwise the `closed` error came from the destination.
+        try:
+            self.src.read(0)
+        except Err as error:
+            if isinstance(error.value, streams.StreamError_Closed):
+                return True
+            raise
+        return False
+
+    def _finish(self) -> Optional[poll.Pollable]:
+        self.finished = monotonic_clock.now()
+        self.release()
+        return None
+
+
+def copy_stream(src: streams.InputStream, dst: streams.OutputStream, limit: Optional[int] = None, chunk: int = 64 * 1024, max_chunk: int = MAX_CHUNK, flush: bool = True, splice: bool = True) -> CopyResult:
+    """
+    Copy `src` into `dst` until `src` ends or `limit` bytes have moved, then
+    flush `dst` unless `flush` is false. Neither stream is closed.
+
+    The chunk size starts at `chunk`, doubles while whole chunks go through
+    and shrinks to the permit granted by `dst`. Pass `splice=False` to force
+    `read`/`write`.
+    """
+    return copy_streams([(src, dst)], limit=limit, chunk=chunk, max_chunk=max_chunk, flush=flush, splice=splice)[0]
+
+
+def copy_streams(pairs: Iterable[Tuple[streams.InputStream, streams.OutputStream]], limit: Optional[int] = None, chunk: int = 64 * 1024, max_chunk: int = MAX_CHUNK, flush: bool = True, splice: bool = True) -> List[CopyResult]:
+    """
+    Run several `copy_stream`s at once, waiting on all of them in a single
+    `poll.poll` per turn. Returns one `CopyResult` per pair, in order.
+    """
+    copies = [_Copy(src, dst, limit, chunk, max_chunk, flush, splice) for src, dst in pairs]
+    pollset = PollSet()
+    runnable = list(copies)
+    woken: List[_Copy] = []
+    try:
+        while runnable:
+            for copy in runnable:
+                pollable = copy.step()
+                if pollable is not None:
+                    copy.registration = pollset.register(pollable, woken.append, copy)
+            if not pollset:
+                break
+            pollset.wait()
+            runnable = list(woken)
+            woken.clear()
+            for copy in runnable:
+                assert copy.registration is not None
+                copy.registration.cancel()
+    finally:
+        for copy in copies:
+            if copy.finished is None:
+                copy.release()
+    return [copy.result() for copy in copies]
@@ -0,0 +1,161 @@
+"""
+Bulk reads from `stdin.get_stdin()`.
+
+`StdinReader` is a `BufferedReader` that fills its buffer with
+`blocking_read`, one host call per fill, and adapts the read size to what
+the host delivers: it doubles while reads come back full, up to `MAX_READ`,
+and halves when they come back mostly empty. Lines, `readinto` and
+`iter_chunks` all come from the same buffer; large `readinto` and
+`iter_chunks` requests skip it.
+
+`text()` decodes incrementally with `codecs.getincrementaldecoder`, so
+multi-byte characters split across reads are decoded correctly.
+"""
+import codecs
+from typing import Iterator, List, Optional
+
+from .wit.imports import stdin
+from .wit.imports import streams
+from .wit.types import Err
+from .reader import DEFAULT_BUFFER_SIZE, BufferedReader
+
+
+MIN_READ = DEFAULT_BUFFER_SIZE
+MAX_READ = 4 * 1024 * 1024
+
+
+class StdinReader(BufferedReader):
+    """
+    A `BufferedReader` over an input stream, stdin by default, that fills
+    with adaptive `blocking_read` sizes between `MIN_READ` and `max_read`.
+    """
+
+    def __init__(self, stream: Optional[streams.InputStream] = None, buffer_size: int = DEFAULT_BUFFER_SIZE, max_read: int = MAX_READ) -> None:
+        super().__init__(stdin.get_stdin() if stream is None else stream, buffer_size)
+        self.max_read = max(max_read, MIN_READ)
+        self.read_size = MIN_READ
+        self.host_reads = 0
+
+    def iter_chunks(self, size: int = DEFAULT_BUFFER_SIZE) -> Iterator[bytes]:
+        """
+        Yield the rest of the stream in chunks of at most `size` bytes.
+        """
+        if size <= 0:
+            raise ValueError("size must be positive")
+        while True:
+            if not self.buffered and size >= self.read_size:
+                data = self._blocking_read(size)
+            else:
+                data = self.read(size)
+            if not data:
+                return
+            yield data
+
+    def text(self, encoding: str = "utf-8", errors: str = "strict") -> "TextReader":
+        """
+        Return a reader decoding the rest of the stream as text.
+        """
+        return TextReader(self, encoding, errors)
+
+    def _fill(self) -> int:
+        if self._eof:
+            return 0
+        self._reserve(self.read_size)
+        data = self._blocking_read(self.read_size)
+        count = len(data)
+        self._buf[self._end:self._end + count] = data
+        self._end += count
+        return count
+
+    def _read_direct(self, target: memoryview) -> int:
+        data = self._blocking_read(len(target))
+        target[:len(data)] = data
+        return len(data)
+
+    def _blocking_read(self, size: int) -> bytes:
+        # Returns `b""` only at end of stream.
+        try:
+            data = self.stream.blocking_read(size)
+        except Err as error:
+            if isinstance(error.value, streams.StreamError_Closed):
+                self._eof = True
+                return b""
+            raise
+        self.host_reads += 1
+        if size == self.read_size:
+            if len(data) == size:
+                self.read_size = min(size * 2, self.max_read)
+            elif len(data) < size // 4:
+                self.read_size = max(size // 2, MIN_READ)
+        return data
+
+
+class TextReader:
+    """
+    Incrementally decoded text from a `StdinReader`. Iterating yields lines
+    including their `"\\n"`.
+    """
+
+    def __init__(self, reader: StdinReader, encoding: str = "utf-8", errors: str = "strict") -> None:
+        self.reader = reader
+        self.encoding = encoding
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors)
+
+    def iter_chunks(self, size: int = DEFAULT_BUFFER_SIZE) -> Iterator[str]:
+        """
+        Yield the rest of the stream as text, decoding at most `size` bytes
+        at a time.
+        """
+        for data in self.reader.iter_chunks(size):
+            text = self._decoder.decode(data)
+            if text:
+                yield text
+        text = self._decoder.decode(b"", True)
+        if text:
+            yield text
+
+    def read(self) -> str:
+        """
+        Return the rest of the stream as text.
+        """
+        return "".join(self.iter_chunks())
+
+    def __iter__(self) -> Iterator[str]:
+        parts: List[str] = []
+        for text in self.iter_chunks():
+            start = 0
+            while True:
+                end = text.find("\n", start) + 1
+                if not end:
+                    break
+                if parts:
+                    parts.append(text[start:end])
+                    yield "".join(parts)
+                    parts.clear()
+                else:
+                    yield text[start:end]
+                start = end
+            if start < len(text):
+                parts.append(text[start:])
+        if parts:
+            yield "".join(parts)
+
+
+_reader: Optional[StdinReader] = None
+
+
+def reader() -> StdinReader:
+    """
+    Return the shared `StdinReader` over `stdin.get_stdin()`.
+    """
+    global _reader
+    if _reader is None:
+        _reader = StdinReader()
+    return _reader
+
+
+def text(encoding: str = "utf-8", errors: str = "strict") -> TextReader:
+    """
+    Return a `TextReader` over the shared `StdinReader`.
+    """
+    return reader().text(encoding, errors)
@@ -0,0 +1,95 @@
+"""
+Buffered `sys.stdout` and `sys.stderr` over the wasi:cli stdio streams.
+
+The default text layer hands each `print` to the host through
+`blocking_write_and_flush`, in pieces of at most 4096 bytes, and flushes every
+time. `install` replaces `sys.stdout` and `sys.stderr` with text files over
+`stdout.get_stdout()` and `stderr.get_stderr()` that buffer up to
+`BUFFER_SIZE` bytes and write them in as few permit-sized `write` calls as
+the host allows. They are line-buffered when the stream is a terminal, as
+reported by `terminal_stdout` / `terminal_stderr`, and block-buffered
+otherwise.
+
+`RunHandler.run` installs them before `handle` and calls `restore` when it
+returns or raises, which flushes them and puts the previous files back.
+"""
+import io
+import sys
+from typing import Callable, Optional, TextIO, Tuple
+
+from .wit.imports import stdout
+from .wit.imports import stderr
+from .wit.imports import streams
+from .wit.imports import terminal_output
+from .wit.imports import terminal_stdout
+from .wit.imports import terminal_stderr
+from .rawio import BufferedOutput, OutputStreamIO
+from .writer import DEFAULT_HIGH_WATER
+
+
+BUFFER_SIZE = DEFAULT_HIGH_WATER
+
+# The installed files, created on first use and kept for later runs.
+_files: Optional[Tuple[io.TextIOWrapper, io.TextIOWrapper]] = None
+# The files `install` replaced, while installed.
+_saved: Optional[Tuple[TextIO, TextIO]] = None
+
+
+def _open(stream: streams.OutputStream, terminal: Callable[[], Optional[terminal_output.TerminalOutput]], errors: str) -> io.TextIOWrapper:
+    tty = terminal()
+    if tty is not None:
+        tty.__exit__(None, None, None)
+    # `BufferedOutput` passes `flush` on to the stream, unlike
+    # `io.BufferedWriter`, so flushing waits for the host.
+    buffered = BufferedOutput(OutputStreamIO(stream), BUFFER_SIZE)
+    return io.TextIOWrapper(buffered, encoding="utf-8", errors=errors, line_buffering=tty is not None)
+
+
+def install() -> None:
+    """
+    Replace `sys.stdout` and `sys.stderr` with buffered files over the
+    stdio streams. Installing twice does nothing.
+    """
+    global _files, _saved
+    if _saved is not None:
+        return
+    if _files is None:
+        _files = (
+            _open(stdout.get_stdout(), terminal_stdout.get_terminal_stdout, "strict"),
+            _open(stderr.get_stderr(), terminal_stderr.get_terminal_stderr, "backslashreplace"),
+        )
+    _saved = (sys.stdout, sys.stderr)
+    sys.stdout, sys.stderr = _files
+
+
+def flush() -> None:
+    """
+    Flush the installed files, stdout first, and wait for the host to flush
+    the streams.
+    """
+    if _files is None:
+        return
+    error = None
+    for file in _files:
+        try:
+            file.flush()
+        except Exception as exc:
+            error = error or exc
+    if error is not None:
+        raise error
+
+
+def restore() -> None:
+    """
+    Flush the installed files and put back the ones `install` replaced, so
+    output written after `RunHandler.run` (a traceback, say) is not left in
+    a buffer.
+    """
+    global _saved
+    if _saved is None:
+        return
+    saved, _saved = _saved, None
+    try:
+        flush()
+    finally:
+        sys.stdout, sys.stderr = saved
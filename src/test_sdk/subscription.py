@@ -0,0 +1,159 @@
+"""
+Cached `subscribe()` pollables.
+
+Every call to `InputStream.subscribe`, `OutputStream.subscribe`,
+`TcpSocket.subscribe`, `IncomingDatagramStream.subscribe`, ... is a host call
+that creates a new child resource, which later costs another host call to
+drop. A `Subscription` creates one pollable per resource, hands out the same
+one for the resource's lifetime, and drops it before the parent resource as
+the WIT child-resource rules require.
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional, Protocol
+
+from .wit.imports import poll
+
+
+class Subscribable(Protocol):
+    def subscribe(self) -> poll.Pollable:
+        ...
+
+    def __exit__(self, *exc_info: object) -> Optional[bool]:
+        ...
+
+
+@dataclass
+class SubscribeStats:
+    """
+    Counters for all subscriptions.
+    """
+
+    created: int = 0
+    """Pollables created with a host `subscribe()` call."""
+    reused: int = 0
+    """Requests answered with an existing pollable."""
+    dropped: int = 0
+    """Pollables released."""
+
+    @property
+    def host_calls_saved(self) -> int:
+        """
+        Host calls avoided: each reuse saves one `subscribe()` and one drop.
+        """
+        return 2 * self.reused
+
+
+stats = SubscribeStats()
+
+
+class Subscription:
+    """
+    The single pollable of one resource.
+
+    Closing the subscription (or leaving its `with` block) drops the pollable
+    and then the resource itself.
+    """
+
+    __slots__ = ("resource", "_pollable")
+
+    def __init__(self, resource: Subscribable) -> None:
+        self.resource = resource
+        self._pollable: Optional[poll.Pollable] = None
+
+    @property
+    def pollable(self) -> poll.Pollable:
+        """
+        The resource's pollable, created on first use.
+        """
+        if self._pollable is None:
+            self._pollable = self.resource.subscribe()
+            stats.created += 1
+        else:
+            stats.reused += 1
+        return self._pollable
+
+    def ready(self) -> bool:
+        return self.pollable.ready()
+
+    def block(self) -> None:
+        self.pollable.block()
+
+    def release(self) -> None:
+        """
+        Drop the pollable but keep the resource. A later `pollable` access
+        subscribes again.
+        """
+        if self._pollable is not None:
+            pollable, self._pollable = self._pollable, None
+            pollable.__exit__(None, None, None)
+            stats.dropped += 1
+
+    def close(self) -> None:
+        """
+        Drop the pollable, then the resource.
+        """
+        if _subscriptions.get(id(self.resource)) is self:
+            del _subscriptions[id(self.resource)]
+        self.release()
+        self.resource.__exit__(None, None, None)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+_subscriptions: Dict[int, Subscription] = {}
+
+
+def subscription(resource: Subscribable) -> Subscription:
+    """
+    Return the shared `Subscription` of `resource`, creating it on first use.
+
+    The registry keeps `resource` alive until `release` or `close` is called
+    for it, so its pollable can never outlive it.
+    """
+    entry = _subscriptions.get(id(resource))
+    if entry is None:
+        entry = _subscriptions[id(resource)] = Subscription(resource)
+    return entry
+
+
+def subscribe(resource: Subscribable) -> poll.Pollable:
+    """
+    Drop-in replacement for `resource.subscribe()` that reuses one pollable
+    per resource. The caller must not drop the returned pollable.
+    """
+    return subscription(resource).pollable
+
+
+def release(resource: Subscribable) -> None:
+    """
+    Drop the cached pollable of `resource`, if any, leaving the resource
+    itself open. Call this before dropping the resource by other means.
+    """
+    entry = _subscriptions.pop(id(resource), None)
+    if entry is not None:
+        entry.release()
+
+
+def close(resource: Subscribable) -> None:
+    """
+    Drop the cached pollable of `resource`, if any, and then the resource.
+    """
+    entry = _subscriptions.get(id(resource))
+    if entry is None:
+        resource.__exit__(None, None, None)
+    else:
+        entry.close()
+
+
+def release_all() -> None:
+    """
+    Drop every cached pollable, leaving their resources open.
+    """
+    entries = list(_subscriptions.values())
+    _subscriptions.clear()
+    for entry in entries:
+        entry.release()
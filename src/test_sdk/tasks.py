@@ -0,0 +1,308 @@
+"""
+Structured concurrency over pollables, without asyncio.
+
+Tasks are plain generators. A task yields a `Pollable` to wait for it, the
+value of `sleep(duration)` to wait for a while, another `Task` to wait for it
+to finish, or `None` to let other tasks run. One `TaskGroup` drives all of its
+tasks through a single `poll.poll` per turn:
+
+    def fetch(request):
+        future = outgoing_handler.handle(request, None)
+        with future.subscribe() as ready:
+            yield ready
+        return future.get()
+
+    with TaskGroup(timeout=5_000_000_000) as group:
+        tasks = [group.spawn(fetch(request)) for request in requests]
+    responses = [task.result for task in tasks]
+
+The group does not take ownership of yielded pollables.
+"""
+from collections import deque
+from typing import Any, Deque, Generator, List, Optional, Tuple
+
+from .wit.imports import poll
+from .wit.imports import monotonic_clock
+from .pollset import PollSet, Registration
+from .timers import Timer, TimerWheel
+from . import instrument
+
+
+class Cancelled(BaseException):
+    """
+    Thrown into a task's generator when the task is cancelled.
+    """
+
+
+class _Sleep:
+    __slots__ = ("deadline",)
+
+    def __init__(self, deadline: int) -> None:
+        self.deadline = deadline
+
+
+def sleep(duration: int) -> Generator[Any, None, None]:
+    """
+    Wait for `duration` nanoseconds: `yield from sleep(duration)`.
+    """
+    yield _Sleep(monotonic_clock.now() + duration)
+
+
+def sleep_until(deadline: int) -> Generator[Any, None, None]:
+    """
+    Wait until the `monotonic_clock` instant `deadline`.
+    """
+    yield _Sleep(deadline)
+
+
+_PENDING = "pending"
+_DONE = "done"
+_FAILED = "failed"
+_CANCELLED = "cancelled"
+
+
+class Task:
+    """
+    A generator scheduled by a `TaskGroup`.
+    """
+
+    def __init__(self, group: "TaskGroup", gen: Generator[Any, None, Any], name: str) -> None:
+        self.name = name
+        self._group = group
+        self._gen = gen
+        self._state = _PENDING
+        self._result: Any = None
+        self._exception: Optional[BaseException] = None
+        self._cancel_requested = False
+        self._wait: Optional[Any] = None
+        self._joiners: List["Task"] = []
+
+    @property
+    def done(self) -> bool:
+        return self._state != _PENDING
+
+    @property
+    def cancelled(self) -> bool:
+        return self._state == _CANCELLED
+
+    @property
+    def result(self) -> Any:
+        """
+        The generator's return value. Raises the task's exception if it
+        failed, `Cancelled` if it was cancelled, and `RuntimeError` if it has
+        not finished yet.
+        """
+        if self._state == _PENDING:
+            raise RuntimeError(f"task {self.name!r} has not finished")
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    @property
+    def exception(self) -> Optional[BaseException]:
+        return self._exception
+
+    def cancel(self) -> None:
+        """
+        Throw `Cancelled` into the task at its next resumption, which happens
+        right away if it is waiting.
+        """
+        if self._state != _PENDING or self._cancel_requested:
+            return
+        self._cancel_requested = True
+        self._group._wake(self)
+
+    def __repr__(self) -> str:
+        return f"<Task {self.name!r} {self._state}>"
+
+
+class TaskGroup:
+    """
+    A nursery of generator tasks.
+
+    Leaving the `with` block (or calling `join`) runs the tasks until all of
+    them have finished. When one task fails, the others are cancelled and the
+    failures are raised together as an `ExceptionGroup`. `timeout` (a
+    duration) or `deadline` (a `monotonic_clock` instant), both in
+    nanoseconds, cancel the whole group and raise `TimeoutError` once passed.
+    """
+
+    def __init__(self, timeout: Optional[int] = None, deadline: Optional[int] = None) -> None:
+        if timeout is not None:
+            expires = monotonic_clock.now() + timeout
+            deadline = expires if deadline is None else min(deadline, expires)
+        self._tasks: List[Task] = []
+        self._pending = 0
+        self._runnable: Deque[Task] = deque()
+        self._pollset = PollSet()
+        self._timers = TimerWheel()
+        self._errors: List[BaseException] = []
+        self._cancelled = False
+        self._timed_out = False
+        self._running = False
+        self._deadline: Optional[Timer] = None
+        if deadline is not None:
+            self._deadline = self._timers.add(deadline, self._expire)
+
+    def __enter__(self) -> "TaskGroup":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Optional[BaseException], traceback: Any) -> Optional[bool]:
+        if exc_value is None:
+            self.join()
+            return None
+        self.cancel()
+        try:
+            self.join()
+        except BaseExceptionGroup as group:
+            raise BaseExceptionGroup("unhandled errors in a TaskGroup", [*group.exceptions, exc_value]) from None
+        except TimeoutError:
+            pass
+        return None
+
+    @property
+    def tasks(self) -> Tuple[Task, ...]:
+        return tuple(self._tasks)
+
+    def spawn(self, gen: Generator[Any, None, Any], name: Optional[str] = None) -> Task:
+        """
+        Schedule the generator `gen` as a new task of this group.
+        """
+        if self._cancelled:
+            gen.close()
+            raise RuntimeError("TaskGroup is cancelled")
+        task = Task(self, gen, name or f"Task-{len(self._tasks) + 1}")
+        self._tasks.append(task)
+        self._pending += 1
+        self._runnable.append(task)
+        return task
+
+    def cancel(self) -> None:
+        """
+        Cancel every unfinished task of the group.
+        """
+        self._cancelled = True
+        for task in self._tasks:
+            task.cancel()
+
+    def join(self) -> None:
+        """
+        Run the group until every task has finished.
+        """
+        if self._running:
+            raise RuntimeError("TaskGroup is already running")
+        self._running = True
+        try:
+            while self._pending:
+                recorder = instrument.recorder
+                if recorder is not None:
+                    recorder.begin_iteration()
+                try:
+                    if recorder is None:
+                        while self._runnable:
+                            self._step(self._runnable.popleft())
+                    else:
+                        while self._runnable:
+                            task = self._runnable.popleft()
+                            start = monotonic_clock.now()
+                            self._step(task)
+                            recorder.record_callback(monotonic_clock.now() - start, task.name)
+                    if not self._pending:
+                        break
+                    if not (self._pollset or self._timers):
+                        raise RuntimeError("every task of the TaskGroup is waiting on another task")
+                    self._pollset.wait(self._timers.pollable())
+                    self._timers.run_expired()
+                finally:
+                    if recorder is not None:
+                        recorder.end_iteration()
+        finally:
+            self._running = False
+            if self._deadline is not None:
+                self._deadline.cancel()
+            self._timers.close()
+        if self._errors:
+            errors, self._errors = self._errors, []
+            raise BaseExceptionGroup("unhandled errors in a TaskGroup", errors)
+        if self._timed_out:
+            raise TimeoutError()
+
+    def _expire(self) -> None:
+        self._timed_out = True
+        self.cancel()
+
+    def _wake(self, task: Task) -> None:
+        wait = task._wait
+        if wait is None:
+            return
+        task._wait = None
+        if isinstance(wait, (Registration, Timer)):
+            wait.cancel()
+        elif isinstance(wait, Task):
+            wait._joiners.remove(task)
+        self._runnable.append(task)
+
+    def _step(self, task: Task) -> None:
+        try:
+            if task._cancel_requested:
+                task._cancel_requested = False
+                yielded = task._gen.throw(Cancelled())
+            else:
+                yielded = task._gen.send(None)
+        except StopIteration as stop:
+            self._finish(task, _DONE, stop.value)
+            return
+        except Cancelled as error:
+            self._finish(task, _CANCELLED, None, error)
+            return
+        except Exception as error:
+            self._finish(task, _FAILED, None, error)
+            self._errors.append(error)
+            self.cancel()
+            return
+        except BaseException:
+            task._state = _FAILED
+            self._pending -= 1
+            raise
+        self._park(task, yielded)
+
+    def _park(self, task: Task, yielded: Any) -> None:
+        if yielded is None:
+            self._runnable.append(task)
+        elif isinstance(yielded, poll.Pollable):
+            task._wait = self._pollset.register(yielded, self._wake, task)
+        elif isinstance(yielded, _Sleep):
+            task._wait = self._timers.add(yielded.deadline, self._wake, task)
+        elif isinstance(yielded, Task):
+            if yielded.done:
+                self._runnable.append(task)
+            else:
+                task._wait = yielded
+                yielded._joiners.append(task)
+        else:
+            task._gen.close()
+            error = TypeError(f"task {task.name!r} yielded {yielded!r}; expected a Pollable, Task, sleep() or None")
+            self._finish(task, _FAILED, None, error)
+            self._errors.append(error)
+            self.cancel()
+
+    def _finish(self, task: Task, state: str, result: Any, error: Optional[BaseException] = None) -> None:
+        task._state = state
+        task._result = result
+        task._exception = error
+        task._gen = None  # type: ignore[assignment]
+        self._pending -= 1
+        joiners, task._joiners = task._joiners, []
+        for joiner in joiners:
+            joiner._wait = None
+            self._runnable.append(joiner)
+
+
+def run(*gens: Generator[Any, None, Any], timeout: Optional[int] = None) -> List[Any]:
+    """
+    Run the generators concurrently in a new `TaskGroup` and return their
+    results in order.
+    """
+    with TaskGroup(timeout=timeout) as group:
+        tasks = [group.spawn(gen) for gen in gens]
+    return [task.result for task in tasks]
@@ -0,0 +1,229 @@
+"""
+Fan-out of one `InputStream` to several `OutputStream`s in bounded memory.
+
+`tee` reads each chunk from the source once and hands the same `bytes` object
+to every sink, within each sink's `check_write` permit. Chunks are kept only
+until the slowest attached sink has written them, and the source is not read
+while `max_buffered` bytes are held. A sink that falls that far behind either
+holds the source back (`BACKPRESSURE`) or is detached so the others can go on
+(`DETACH`).
+"""
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Iterable, List, Optional
+
+from .wit.imports import poll
+from .wit.imports import streams
+from .wit.types import Err
+from .pollset import PollSet
+from .subscription import Subscription
+
+
+DEFAULT_MAX_BUFFERED = 256 * 1024
+
+BACKPRESSURE = "backpressure"
+"""Stop reading the source until the slowest sink catches up."""
+DETACH = "detach"
+"""Detach the slowest sinks once the buffer is full and another sink is ahead."""
+
+
+@dataclass
+class SinkResult:
+    transferred: int
+    """Bytes written to the sink."""
+    detached: bool = False
+    """Whether the sink was dropped from the fan-out before the end."""
+    error: Optional[Err] = None
+    """The error that detached the sink, if any."""
+
+
+@dataclass
+class TeeResult:
+    read: int
+    """Bytes read from the source."""
+    sinks: List[SinkResult]
+    """One result per sink, in order."""
+    peak_buffered: int
+    """Most bytes held at once."""
+
+
+class _Sink:
+    __slots__ = ("stream", "seq", "offset", "transferred", "detached", "error", "flushing", "done", "subscription")
+
+    def __init__(self, stream: streams.OutputStream) -> None:
+        self.stream = stream
+        # Position: `offset` bytes into the chunk numbered `seq`.
+        self.seq = 0
+        self.offset = 0
+        self.transferred = 0
+        self.detached = False
+        self.error: Optional[Err] = None
+        self.flushing = False
+        self.done = False
+        self.subscription = Subscription(stream)
+
+    @property
+    def attached(self) -> bool:
+        return not (self.detached or self.done)
+
+    def result(self) -> SinkResult:
+        return SinkResult(self.transferred, self.detached, self.error)
+
+
+class _Tee:
+    # A non-blocking fan-out state machine. `step` does all the work possible
+    # without blocking and returns the pollables to wait on next, or an empty
+    # list once every sink is done or detached.
+
+    def __init__(self, src: streams.InputStream, sinks: Iterable[streams.OutputStream], max_buffered: int, chunk: int, policy: str, flush: bool) -> None:
+        if max_buffered <= 0 or chunk <= 0:
+            raise ValueError("max_buffered and chunk must be positive")
+        if policy not in (BACKPRESSURE, DETACH):
+            raise ValueError(f"unknown policy {policy!r}")
+        self.src = src
+        self.sinks = [_Sink(sink) for sink in sinks]
+        self.max_buffered = max_buffered
+        self.chunk = chunk
+        self.policy = policy
+        self.flush = flush
+        self.chunks: Deque[bytes] = deque()
+        self.first_seq = 0
+        self.buffered = 0
+        self.peak_buffered = 0
+        self.read = 0
+        self.eof = False
+        self._src = Subscription(src)
+
+    def result(self) -> TeeResult:
+        return TeeResult(self.read, [sink.result() for sink in self.sinks], self.peak_buffered)
+
+    def release(self) -> None:
+        self._src.release()
+        for sink in self.sinks:
+            sink.subscription.release()
+
+    def step(self) -> List[poll.Pollable]:
+        while True:
+            waits = []
+            for sink in self.sinks:
+                if sink.attached:
+                    pollable = self._pump(sink)
+                    if pollable is not None:
+                        waits.append(pollable)
+            attached = [sink for sink in self.sinks if sink.attached]
+            self._trim(attached)
+            if not attached:
+                return []
+            if self.eof:
+                return waits
+            if self.buffered < self.max_buffered:
+                try:
+                    data = self.src.read(min(self.chunk, self.max_buffered - self.buffered))
+                except Err as error:
+                    if not isinstance(error.value, streams.StreamError_Closed):
+                        raise
+                    self.eof = True
+                    continue
+                if data:
+                    self._append(data)
+                    continue
+                waits.append(self._src.pollable)
+            elif self.policy == DETACH and self._detach_laggards(attached):
+                continue
+            return waits
+
+    def _pump(self, sink: _Sink) -> Optional[poll.Pollable]:
+        # Writes as much as the sink's permit allows. Returns the sink's
+        # pollable when it is blocked on a permit or a flush.
+        try:
+            if sink.flushing:
+                # A flush is complete once writes are accepted again.
+                if not sink.stream.check_write():
+                    return sink.subscription.pollable
+                sink.done = True
+                return None
+            end = self.first_seq + len(self.chunks)
+            while sink.seq < end:
+                permit = sink.stream.check_write()
+                if not permit:
+                    return sink.subscription.pollable
+                chunk = self.chunks[sink.seq - self.first_seq]
+                if not sink.offset and permit >= len(chunk):
+                    data = chunk
+                else:
+                    data = chunk[sink.offset:sink.offset + permit]
+                sink.stream.write(data)
+                sink.transferred += len(data)
+                sink.offset += len(data)
+                if sink.offset == len(chunk):
+                    sink.seq += 1
+                    sink.offset = 0
+            if not self.eof:
+                return None
+            if not self.flush:
+                sink.done = True
+                return None
+            sink.stream.flush()
+            sink.flushing = True
+            return sink.subscription.pollable
+        except Err as error:
+            sink.detached = True
+            sink.error = error
+            return None
+
+    def _append(self, data: bytes) -> None:
+        self.chunks.append(data)
+        self.buffered += len(data)
+        self.read += len(data)
+        if self.buffered > self.peak_buffered:
+            self.peak_buffered = self.buffered
+
+    def _trim(self, attached: List[_Sink]) -> None:
+        # Drops the chunks every attached sink has written.
+        keep = min((sink.seq for sink in attached), default=self.first_seq + len(self.chunks))
+        while self.first_seq < keep:
+            self.buffered -= len(self.chunks.popleft())
+            self.first_seq += 1
+
+    def _detach_laggards(self, attached: List[_Sink]) -> bool:
+        # With the buffer full, detaches the sinks holding the oldest chunk,
+        # provided some other sink is ahead of them.
+        laggards = [sink for sink in attached if sink.seq == self.first_seq]
+        if len(laggards) == len(attached):
+            return False
+        for sink in laggards:
+            sink.detached = True
+        return True
+
+
+def tee(src: streams.InputStream, sinks: Iterable[streams.OutputStream], max_buffered: int = DEFAULT_MAX_BUFFERED, chunk: int = 64 * 1024, policy: str = BACKPRESSURE, flush: bool = True) -> TeeResult:
+    """
+    Copy `src` to every stream in `sinks` until `src` ends, holding at most
+    `max_buffered` bytes, then flush the sinks unless `flush` is false. No
+    stream is closed.
+
+    `policy` decides what happens when the buffer is full because of a slow
+    sink: `BACKPRESSURE` waits for it, `DETACH` stops writing to it. A sink
+    whose `check_write`, `write` or `flush` fails is detached under either
+    policy, with the error in its `SinkResult`; errors reading `src` other
+    than the end of the stream are raised.
+    """
+    state = _Tee(src, sinks, max_buffered, chunk, policy, flush)
+    pollset = PollSet()
+    try:
+        while True:
+            waits = state.step()
+            if not waits:
+                break
+            for pollable in waits:
+                pollset.register(pollable, _woken)
+            pollset.wait()
+            pollset.clear()
+    finally:
+        state.release()
+    return state.result()
+
+
+def _woken() -> None:
+    # Readiness is rechecked by `_Tee.step` on the next turn.
+    pass
@@ -0,0 +1,267 @@
+"""
+A hierarchical timer wheel keyed on `monotonic_clock.now()`.
+
+Any number of timers share a single `subscribe_instant` pollable for the
+earliest deadline, so the list handed to `poll.poll` does not grow with the
+number of pending timeouts. Insertion and cancellation are O(1).
+"""
+from typing import Any, Callable, Dict, List, Optional
+
+from .wit.imports import poll
+from .wit.imports import monotonic_clock
+
+
+class Timer:
+    """
+    A pending callback returned by `TimerWheel.add`.
+    """
+
+    __slots__ = ("deadline", "callback", "args", "_tick", "_seq", "_level", "_slot", "_wheel")
+
+    def __init__(self, wheel: "TimerWheel", deadline: int, tick: int, seq: int, callback: Callable[..., Any], args: tuple) -> None:
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self._tick = tick
+        self._seq = seq
+        self._level = 0
+        self._slot: Optional[Dict["Timer", None]] = None
+        self._wheel: Optional["TimerWheel"] = wheel
+
+    @property
+    def active(self) -> bool:
+        """
+        Whether the timer is still waiting to fire.
+        """
+        return self._slot is not None
+
+    def cancel(self) -> None:
+        """
+        Remove the timer from its wheel. Cancelling a timer that already
+        fired or was cancelled does nothing.
+        """
+        if self._slot is not None and self._wheel is not None:
+            self._wheel._remove(self)
+
+    def __repr__(self) -> str:
+        state = "active" if self.active else "inactive"
+        return f"<Timer deadline={self.deadline} {state}>"
+
+
+class TimerWheel:
+    """
+    Hashed hierarchical timing wheel.
+
+    Deadlines are absolute `monotonic_clock` instants in nanoseconds and are
+    rounded up to `resolution`, so a timer never fires early but may fire up
+    to one resolution late. `levels` wheels of `2 ** slot_bits` slots each
+    cover `resolution * 2 ** (slot_bits * levels)` nanoseconds (about 4.6
+    hours with the defaults); later deadlines wait in an overflow bucket.
+    """
+
+    def __init__(self, resolution: int = 1_000_000, slot_bits: int = 6, levels: int = 4) -> None:
+        if resolution <= 0:
+            raise ValueError("resolution must be positive")
+        self.resolution = resolution
+        self._bits = slot_bits
+        self._mask = (1 << slot_bits) - 1
+        self._levels = levels
+        self._wheels: List[List[Dict[Timer, None]]] = [
+            [{} for _ in range(1 << slot_bits)] for _ in range(levels)
+        ]
+        self._counts = [0] * levels
+        self._due: Dict[Timer, None] = {}
+        self._overflow: Dict[Timer, None] = {}
+        self._tick = monotonic_clock.now() // resolution
+        self._seq = 0
+        self._size = 0
+        self._next: Optional[int] = None
+        self._next_valid = True
+        self._pollable: Optional[poll.Pollable] = None
+        self._pollable_instant: Optional[int] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, deadline: int, callback: Callable[..., Any], *args: Any) -> Timer:
+        """
+        Schedule `callback(*args)` for the absolute instant `deadline`.
+        """
+        tick = -(-deadline // self.resolution)
+        self._seq += 1
+        timer = Timer(self, deadline, tick, self._seq, callback, args)
+        self._place(timer)
+        self._size += 1
+        if self._next_valid and (self._next is None or self._fire_time(timer) < self._next):
+            self._next = self._fire_time(timer)
+        return timer
+
+    def add_after(self, duration: int, callback: Callable[..., Any], *args: Any) -> Timer:
+        """
+        Schedule `callback(*args)` to run `duration` nanoseconds from now.
+        """
+        return self.add(monotonic_clock.now() + duration, callback, *args)
+
+    def next_deadline(self) -> Optional[int]:
+        """
+        Return the instant at which the earliest timer becomes due, or `None`
+        when the wheel is empty.
+        """
+        if not self._next_valid:
+            self._next = self._find_next()
+            self._next_valid = True
+        return self._next
+
+    def pollable(self) -> Optional[poll.Pollable]:
+        """
+        Return a pollable that becomes ready when the earliest timer is due,
+        or `None` when the wheel is empty.
+
+        The pollable is owned by the wheel and reused until the earliest
+        deadline changes; callers must not drop it.
+        """
+        instant = self.next_deadline()
+        if instant != self._pollable_instant:
+            self._drop_pollable()
+            if instant is not None:
+                self._pollable = monotonic_clock.subscribe_instant(instant)
+                self._pollable_instant = instant
+        return self._pollable
+
+    def expire(self, now: Optional[int] = None) -> List[Timer]:
+        """
+        Advance the wheel to `now` (the current time by default) and return
+        the timers that became due, ordered by deadline. Their callbacks are
+        not invoked; see `run_expired`.
+        """
+        if now is None:
+            now = monotonic_clock.now()
+        target = now // self.resolution
+        if target > self._tick:
+            self._advance(target)
+        if not self._due:
+            return []
+        fired = sorted(self._due, key=_timer_order)
+        self._due = {}
+        for timer in fired:
+            timer._slot = None
+            timer._wheel = None
+        self._size -= len(fired)
+        self._next_valid = False
+        return fired
+
+    def run_expired(self, now: Optional[int] = None) -> int:
+        """
+        Invoke the callbacks of all due timers and return how many ran.
+        """
+        fired = self.expire(now)
+        for timer in fired:
+            timer.callback(*timer.args)
+        return len(fired)
+
+    def close(self) -> None:
+        """
+        Cancel all timers and drop the clock pollable.
+        """
+        for level in self._wheels:
+            for slot in level:
+                for timer in slot:
+                    timer._slot = None
+                slot.clear()
+        for bucket in (self._due, self._overflow):
+            for timer in bucket:
+                timer._slot = None
+            bucket.clear()
+        self._counts = [0] * self._levels
+        self._size = 0
+        self._next = None
+        self._next_valid = True
+        self._drop_pollable()
+
+    def _fire_time(self, timer: Timer) -> int:
+        return max(timer._tick, self._tick) * self.resolution
+
+    def _place(self, timer: Timer) -> None:
+        tick = timer._tick
+        current = self._tick
+        if tick <= current:
+            timer._level = -1
+            timer._slot = self._due
+            self._due[timer] = None
+            return
+        for level in range(self._levels):
+            shift = self._bits * level
+            if tick >> (shift + self._bits) == current >> (shift + self._bits):
+                slot = self._wheels[level][(tick >> shift) & self._mask]
+                timer._level = level
+                timer._slot = slot
+                slot[timer] = None
+                self._counts[level] += 1
+                return
+        timer._level = self._levels
+        timer._slot = self._overflow
+        self._overflow[timer] = None
+
+    def _remove(self, timer: Timer) -> None:
+        slot = timer._slot
+        assert slot is not None
+        del slot[timer]
+        if 0 <= timer._level < self._levels:
+            self._counts[timer._level] -= 1
+        timer._slot = None
+        timer._wheel = None
+        self._size -= 1
+        if self._next_valid and self._next == self._fire_time(timer):
+            self._next_valid = False
+
+    def _advance(self, target: int) -> None:
+        current = self._tick
+        pending: List[Timer] = []
+        for level in range(self._levels):
+            if not self._counts[level]:
+                continue
+            shift = self._bits * level
+            slots = self._wheels[level]
+            if target >> (shift + self._bits) != current >> (shift + self._bits):
+                indices = range(len(slots))
+            else:
+                indices = range(((current >> shift) & self._mask) + 1, ((target >> shift) & self._mask) + 1)
+            for index in indices:
+                slot = slots[index]
+                if slot:
+                    pending.extend(slot)
+                    self._counts[level] -= len(slot)
+                    slot.clear()
+        top = self._bits * self._levels
+        if self._overflow and target >> top != current >> top:
+            pending.extend(self._overflow)
+            self._overflow.clear()
+        self._tick = target
+        for timer in pending:
+            self._place(timer)
+        self._next_valid = False
+
+    def _find_next(self) -> Optional[int]:
+        if self._due:
+            return self._tick * self.resolution
+        for level in range(self._levels):
+            if not self._counts[level]:
+                continue
+            shift = self._bits * level
+            slots = self._wheels[level]
+            for index in range(((self._tick >> shift) & self._mask) + 1, len(slots)):
+                if slots[index]:
+                    return min(timer._tick for timer in slots[index]) * self.resolution
+        if self._overflow:
+            return min(timer._tick for timer in self._overflow) * self.resolution
+        return None
+
+    def _drop_pollable(self) -> None:
+        if self._pollable is not None:
+            self._pollable.__exit__(None, None, None)
+            self._pollable = None
+            self._pollable_instant = None
+
+
+def _timer_order(timer: Timer) -> tuple:
+    return (timer.deadline, timer._seq)
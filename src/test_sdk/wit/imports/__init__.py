@@ -0,0 +1,53 @@
+"""
+The imported interfaces, one module each, loaded on first use:
+`imports.streams` and `from .imports import streams` both import only
+`streams` and what it depends on.
+"""
+import importlib
+from typing import Any, List
+
+
+__all__ = [
+    "environment",
+    "error",
+    "exit",
+    "insecure",
+    "insecure_seed",
+    "instance_network",
+    "ip_name_lookup",
+    "monotonic_clock",
+    "network",
+    "outgoing_handler",
+    "poll",
+    "preopens",
+    "random",
+    "stderr",
+    "stdin",
+    "stdout",
+    "streams",
+    "tcp",
+    "tcp_create_socket",
+    "terminal_input",
+    "terminal_output",
+    "terminal_stderr",
+    "terminal_stdin",
+    "terminal_stdout",
+    "udp",
+    "udp_create_socket",
+    "wall_clock",
+    "wasi_filesystem_types",
+    "wasi_http_types",
+]
+
+_INTERFACES = frozenset(__all__)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _INTERFACES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Importing the submodule also sets it as an attribute of the package.
+    return importlib.import_module(f"{__name__}.{name}")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | _INTERFACES)
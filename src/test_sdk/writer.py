@@ -0,0 +1,236 @@
+"""
+A permit-aware buffered writer over `streams.OutputStream`.
+
+`blocking_write_and_flush` is limited to 4096 bytes and flushes on every
+call, and `write` traps when given more than `check_write` permits. The
+writer coalesces small writes into one buffer and hands it to the host in
+chunks sized to the current permit, flushing only on request, at the
+high-water mark, or when `RunHandler.run` returns.
+
+With `zero_run` set, runs of at least that many zero bytes are sent with
+`write_zeroes`, so the zeros never cross the component boundary.
+"""
+import re
+from typing import Dict, Tuple, Union
+
+from .wit.imports import streams
+from .subscription import Subscription
+
+
+DEFAULT_HIGH_WATER = 64 * 1024
+ZERO_RUN = 4096
+"""A good `zero_run` for block-oriented data such as disk images."""
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class BufferedWriter:
+    """
+    Buffered writes to an `OutputStream`.
+
+    The writer owns `stream`: `close()` flushes, drops the stream's pollable
+    and then the stream. Buffered data is handed to the host once
+    `high_water` bytes have accumulated; `flush()` also asks the host to
+    flush its own buffers and waits for that to complete.
+
+    When `zero_run` is positive, runs of at least `zero_run` zero bytes are
+    handed over with `write_zeroes` instead of `write`; `bytes_zeroed`
+    counts the bytes that did not have to be copied to the host.
+    `zero_run` must not exceed `high_water`.
+    """
+
+    def __init__(self, stream: streams.OutputStream, high_water: int = DEFAULT_HIGH_WATER, zero_run: int = 0) -> None:
+        if high_water <= 0:
+            raise ValueError("high_water must be positive")
+        if zero_run < 0:
+            raise ValueError("zero_run must not be negative")
+        if zero_run > high_water:
+            # Drains start at `high_water` buffered bytes, so a longer run
+            # would only be seen after an occasional oversized write.
+            raise ValueError("zero_run must not exceed high_water")
+        self.stream = stream
+        self.high_water = high_water
+        self.zero_run = zero_run
+        self.host_writes = 0
+        self.bytes_written = 0
+        self.bytes_zeroed = 0
+        self._subscription = Subscription(stream)
+        self._buf = bytearray()
+        self._closed = False
+        _writers[id(self)] = self
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def buffered(self) -> int:
+        """
+        Number of bytes not yet handed to the host.
+        """
+        return len(self._buf)
+
+    def write(self, data: Buffer) -> int:
+        """
+        Buffer `data`, handing the buffer to the host if it reaches the
+        high-water mark. Returns `len(data)`.
+        """
+        if self._closed:
+            raise ValueError("write to closed BufferedWriter")
+        self._buf += data
+        if len(self._buf) >= self.high_water:
+            self.drain()
+        return len(data)
+
+    def pump(self) -> bool:
+        """
+        Hand the host as much buffered data as the current permit allows,
+        without blocking. Returns whether the buffer is now empty.
+        """
+        while self._buf:
+            permit = self.stream.check_write()
+            if not permit:
+                return False
+            self._write(permit)
+        return True
+
+    def drain(self) -> None:
+        """
+        Hand all buffered data to the host, waiting for permits as needed.
+        """
+        while not self.pump():
+            self._subscription.block()
+
+    def flush(self) -> None:
+        """
+        Drain the buffer, then flush the stream and wait for completion.
+        """
+        self.drain()
+        self.stream.flush()
+        self._subscription.block()
+        # Surfaces any error raised while the host was flushing.
+        self.stream.check_write()
+
+    def close(self) -> None:
+        """
+        Flush, then drop the stream's pollable and the stream.
+        """
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._release()
+
+    async def adrain(self) -> None:
+        """
+        Like `drain`, but waits for permits on the running `PollLoop`
+        instead of blocking it.
+        """
+        from .loop import wait_ready
+        while not self.pump():
+            await wait_ready(self._subscription.pollable)
+
+    async def aflush(self) -> None:
+        """
+        Like `flush`, without blocking the running `PollLoop`.
+        """
+        from .loop import wait_ready
+        await self.adrain()
+        self.stream.flush()
+        await wait_ready(self._subscription.pollable)
+        self.stream.check_write()
+
+    async def aclose(self) -> None:
+        """
+        Like `close`, without blocking the running `PollLoop`.
+        """
+        if self._closed:
+            return
+        try:
+            await self.aflush()
+        finally:
+            self._release()
+
+    def __enter__(self) -> "BufferedWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "BufferedWriter":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    def _release(self) -> None:
+        self._closed = True
+        _writers.pop(id(self), None)
+        self._subscription.close()
+
+    def _write(self, permit: int) -> None:
+        count = min(permit, len(self._buf))
+        zeros = False
+        if self.zero_run:
+            zeros, count = split_zeros(self._buf, count, self.zero_run)
+        if zeros:
+            self.stream.write_zeroes(count)
+            self.bytes_zeroed += count
+        else:
+            with memoryview(self._buf) as view:
+                chunk = bytes(view[:count])
+            self.stream.write(chunk)
+        del self._buf[:count]
+        self.host_writes += 1
+        self.bytes_written += count
+
+
+_NONZERO = re.compile(b"[^\\x00]")
+_zero_blocks: Dict[int, bytes] = {}
+
+
+def split_zeros(data: Buffer, count: int, zero_run: int) -> Tuple[bool, int]:
+    """
+    Decide how to send the first `count` bytes of `data`. Returns `(True,
+    n)` when `data` starts with a run of at least `zero_run` zeros, `n` of
+    which fit in `count`, and `(False, n)` for the `n` bytes before the next
+    such run (or all `count`). A run may extend past `count`.
+    """
+    end = _NONZERO.search(data, 0, max(count, zero_run))
+    run = end.start() if end is not None else min(len(data), max(count, zero_run))
+    if run >= zero_run:
+        return True, min(run, count)
+    block = _zero_blocks.get(zero_run)
+    if block is None:
+        block = _zero_blocks[zero_run] = bytes(zero_run)
+    # A substring search stays linear where a `\x00{n}` regex restarts its
+    # count at every offset and costs O(len * n) on runs just under `n`.
+    stop = count + zero_run - 1
+    if isinstance(data, memoryview):
+        # `memoryview` has no `find`; search a copy of the window.
+        found = bytes(data[1:stop]).find(block)
+        found = found + 1 if found >= 0 else -1
+    else:
+        found = data.find(block, 1, stop)
+    return False, count if found < 0 else min(found, count)
+
+
+# Open writers are kept alive until closed so buffered data is never lost to
+# garbage collection before `flush_all` runs.
+_writers: Dict[int, BufferedWriter] = {}
+
+
+def flush_all() -> None:
+    """
+    Flush every open `BufferedWriter`. `RunHandler.run` calls this when the
+    handler returns or raises.
+    """
+    error = None
+    for writer in list(_writers.values()):
+        try:
+            writer.flush()
+        except Exception as exc:
+            error = error or exc
+    if error is not None:
+        raise error
@@ -0,0 +1,70 @@
+"""
+In-memory stand-ins for the wasi:io streams, for tests outside a component.
+"""
+from test_sdk.wit.imports import poll, streams
+from test_sdk.wit.types import Err
+
+
+class MemoryInput(streams.InputStream):
+    # Returns `data` in reads of at most `chunk` bytes, then reports closed.
+
+    def __init__(self, data: bytes, chunk: int) -> None:
+        self.data = data
+        self.chunk = chunk
+
+    def read(self, len: int) -> bytes:
+        if not self.data:
+            raise Err(streams.StreamError_Closed())
+        size = min(len, self.chunk)
+        data, self.data = self.data[:size], self.data[size:]
+        return data
+
+    def subscribe(self) -> poll.Pollable:
+        return ReadyPollable()
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+
+class ReadyPollable(poll.Pollable):
+    def ready(self) -> bool:
+        return True
+
+    def block(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+
+class MemoryOutput(streams.OutputStream):
+    # Accepts every write and flush immediately, counting the calls.
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self.writes = 0
+        self.flushes = 0
+        self.blocking_flushes = 0
+
+    def check_write(self) -> int:
+        return 1 << 20
+
+    def write(self, contents: bytes) -> None:
+        self.writes += 1
+        self.data += contents
+
+    def write_zeroes(self, len: int) -> None:
+        self.writes += 1
+        self.data += bytes(len)
+
+    def flush(self) -> None:
+        self.flushes += 1
+
+    def blocking_flush(self) -> None:
+        self.blocking_flushes += 1
+
+    def subscribe(self) -> poll.Pollable:
+        return ReadyPollable()
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
@@ -0,0 +1,51 @@
+import gzip
+import zlib
+
+import pytest
+
+from test_sdk.compress import CompressWriter, DecompressReader
+
+from memory import MemoryInput, MemoryOutput
+
+
+@pytest.mark.parametrize("payload", [b"", b"A", b"AB", gzip.compress(b"A")])
+def test_detected_passthrough_short_payloads(payload):
+    output = MemoryOutput()
+    with CompressWriter(output, passthrough=None) as writer:
+        writer.write(payload)
+    if payload.startswith(b"\x1f\x8b"):
+        assert bytes(output.data) == payload
+    else:
+        assert gzip.decompress(bytes(output.data)) == payload
+
+
+def test_concatenated_gzip_members_small_reads():
+    first = bytes(range(256)) * 64
+    second = b"second member " * 500
+    payload = gzip.compress(first) + gzip.compress(second)
+    # Whole reads leave the second member behind the first's end while its
+    # output is still limited; small reads split the members across reads.
+    for chunk in (len(payload), 7):
+        reader = DecompressReader(MemoryInput(payload, chunk), read_size=len(payload))
+        chunks = []
+        while True:
+            data = reader.read(3)
+            if not data:
+                break
+            chunks.append(data)
+        assert b"".join(chunks) == first + second
+        assert reader.bytes_in == len(payload)
+
+
+def compressed(data, wbits):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, wbits)
+    return compressor.compress(data) + compressor.flush()
+
+
+@pytest.mark.parametrize("format, wbits", [("gzip", 31), ("zlib", 15), ("deflate", -15), ("auto", 31), ("auto", 15)])
+@pytest.mark.parametrize("trailer", [b"\0", bytes(512), b"garbage after the end"])
+@pytest.mark.parametrize("chunk", [1, 7, 1 << 16])
+def test_trailing_data_is_ignored(format, wbits, trailer, chunk):
+    payload = b"payload " * 300
+    reader = DecompressReader(MemoryInput(compressed(payload, wbits) + trailer, chunk), format, read_size=64)
+    assert reader.read() == payload
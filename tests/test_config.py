@@ -0,0 +1,31 @@
+import pytest
+
+from test_sdk.config import Config, ConfigError
+
+
+@pytest.mark.parametrize("value", ["inf", "-Infinity", "nan", "9" * 400 + "s"])
+def test_duration_not_finite(value):
+    with pytest.raises(ConfigError):
+        Config({"T": value}).get_duration("T")
+
+
+def test_size_not_finite():
+    with pytest.raises(ConfigError):
+        Config({"S": "9" * 400}).get_size("S")
+
+
+@pytest.mark.parametrize("value", ["-5", "-5s", "+5", "1_0", "1e3", "٥", " - 1m"])
+def test_duration_not_plain(value):
+    with pytest.raises(ConfigError):
+        Config({"T": value}).get_duration("T")
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("5", 5_000_000_000),
+    ("0.25", 250_000_000),
+    ("1m30s", 90_000_000_000),
+    ("250ms", 250_000_000),
+    (" 1.5h ", 5_400_000_000_000),
+])
+def test_duration(value, expected):
+    assert Config({"T": value}).get_duration("T") == expected
@@ -0,0 +1,26 @@
+import importlib.util
+import os
+import statistics
+
+BENCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench", "import_time.py")
+
+# Several times the usual cold import on CPython, so only a real regression
+# (an eager import of a large interface, say) fails.
+BUDGET_MS = 250
+
+
+def load_bench():
+    spec = importlib.util.spec_from_file_location("import_time", BENCH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_no_unexpected_modules():
+    assert load_bench().unexpected_modules() == []
+
+
+def test_import_time_budget():
+    bench = load_bench()
+    median_ms = statistics.median(bench.import_us() for _ in range(3)) / 1000
+    assert median_ms <= BUDGET_MS
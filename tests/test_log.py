@@ -0,0 +1,61 @@
+import json
+
+from test_sdk import log
+from test_sdk.wit.imports import streams
+from test_sdk.wit.types import Err
+
+from memory import MemoryOutput
+
+
+def drained(logger):
+    logger.flush()
+    return bytes(logger.stream.data).decode().splitlines()
+
+
+def test_level_methods():
+    logger = log.Logger("app", MemoryOutput(), level=log.DEBUG)
+    try:
+        logger.debug("d %d", 1)
+        logger.info("i")
+        logger.warning("w", key="v")
+        logger.error("e %s", "x")
+        lines = drained(logger)
+    finally:
+        logger.close()
+    assert [line.split(" ", 1)[1] for line in lines] == [
+        "DEBUG app d 1",
+        "INFO app i",
+        "WARNING app w key='v'",
+        "ERROR app e x",
+    ]
+    assert logger.logged == 4
+
+
+def test_level_filter_and_json():
+    logger = log.Logger(stream=MemoryOutput(), json=True, level=log.WARNING)
+    try:
+        logger.info("skipped")
+        logger.error("kept", code=3)
+        lines = drained(logger)
+    finally:
+        logger.close()
+    assert len(lines) == 1
+    entry = json.loads(lines[0])
+    assert (entry["level"], entry["msg"], entry["code"]) == ("ERROR", "kept", 3)
+
+
+class FailingOutput(MemoryOutput):
+    def write(self, contents: bytes) -> None:
+        raise Err(streams.StreamError_Closed())
+
+
+def test_idle_hook_error_is_kept():
+    logger = log.Logger(stream=FailingOutput())
+    try:
+        logger.error("lost")
+        logger._idle()
+        assert logger.errors == 1
+        assert isinstance(logger.last_error, Err)
+        logger.error("still callable")
+    finally:
+        log._loggers.pop(id(logger), None)
@@ -0,0 +1,14 @@
+from test_sdk.rawio import open_output
+
+from memory import MemoryOutput
+
+
+def test_open_output_flush_waits_for_host():
+    stream = MemoryOutput()
+    file = open_output(stream)
+    file.write(b"data")
+    file.flush()
+    assert bytes(stream.data) == b"data"
+    assert stream.blocking_flushes == 1
+    file.close()
+    assert stream.blocking_flushes >= 2
@@ -0,0 +1,23 @@
+import pytest
+
+from test_sdk.router import Router
+
+
+def handler(args):
+    return args
+
+
+def test_add_conflict_registers_nothing():
+    router = Router("tool")
+    router.add("a", handler)
+    with pytest.raises(ValueError):
+        router.add("b", handler, aliases=("a",))
+    router.add("b", handler)
+    assert router.dispatch(["b", "x"]) == ["x"]
+
+
+def test_add_duplicate_alias():
+    router = Router("tool")
+    with pytest.raises(ValueError):
+        router.add("a", handler, aliases=("a",))
+    router.add("a", handler)
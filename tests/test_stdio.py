@@ -0,0 +1,33 @@
+import sys
+
+import pytest
+
+from test_sdk import stdio
+from test_sdk.wit.imports import stderr, stdout, terminal_stderr, terminal_stdout
+
+from memory import MemoryOutput
+
+
+@pytest.fixture
+def streams(monkeypatch):
+    out, err = MemoryOutput(), MemoryOutput()
+    monkeypatch.setattr(stdout, "get_stdout", lambda: out)
+    monkeypatch.setattr(stderr, "get_stderr", lambda: err)
+    monkeypatch.setattr(terminal_stdout, "get_terminal_stdout", lambda: None)
+    monkeypatch.setattr(terminal_stderr, "get_terminal_stderr", lambda: None)
+    monkeypatch.setattr(stdio, "_files", None)
+    yield out, err
+    stdio.restore()
+
+
+def test_restore_waits_for_host_flush(streams):
+    out, err = streams
+    stdio.install()
+    print("hello")
+    sys.stderr.write("oops\n")
+    assert out.blocking_flushes == 0
+    stdio.restore()
+    assert bytes(out.data) == b"hello\n"
+    assert bytes(err.data) == b"oops\n"
+    assert out.blocking_flushes == 1
+    assert err.blocking_flushes == 1
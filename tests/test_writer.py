@@ -0,0 +1,55 @@
+import random
+import time
+
+import pytest
+
+from test_sdk.writer import BufferedWriter, split_zeros
+
+from memory import MemoryOutput
+
+
+def reference(data, count, zero_run):
+    # The first run of `zero_run` zeros, checked one offset at a time.
+    def run_at(i):
+        return data[i:i + zero_run] == bytes(zero_run)
+    if run_at(0):
+        run = len(data) - len(bytes(data).lstrip(b"\0"))
+        return True, min(run, count)
+    for i in range(1, count):
+        if run_at(i):
+            return False, i
+    return False, count
+
+
+@pytest.mark.parametrize("wrap", [bytearray, memoryview])
+def test_split_zeros_matches_reference(wrap):
+    rng = random.Random(15)
+    for _ in range(300):
+        data = bytearray()
+        while len(data) < 200:
+            data += bytes(rng.choice((0, 1, 3, 7, 8, 9, 20))) + b"\1" * rng.randint(0, 3)
+        count = rng.randint(1, len(data))
+        zero_run = rng.choice((1, 4, 8))
+        assert split_zeros(wrap(data), count, zero_run) == reference(data, count, zero_run)
+
+
+def test_split_zeros_runs_just_short_is_linear():
+    data = bytearray((bytes(4095) + b"\1") * 256)
+    start = time.perf_counter()
+    assert split_zeros(data, len(data), 4096) == (False, len(data))
+    assert split_zeros(memoryview(data), len(data), 4096) == (False, len(data))
+    assert time.perf_counter() - start < 0.5
+
+
+def test_zero_run_longer_than_high_water():
+    with pytest.raises(ValueError):
+        BufferedWriter(MemoryOutput(), high_water=1024, zero_run=4096)
+
+
+def test_writer_sends_zero_runs_with_write_zeroes():
+    stream = MemoryOutput()
+    payload = b"head" + bytes(8192) + b"tail"
+    with BufferedWriter(stream, high_water=4096, zero_run=4096) as writer:
+        writer.write(payload)
+    assert bytes(stream.data) == payload
+    assert writer.bytes_zeroed >= 4096